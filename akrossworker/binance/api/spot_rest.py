@@ -41,6 +41,22 @@ class BinanceSpotRest:
             response = response[-count:]
         return response
 
+    def klines_page(self, symbol, interval, start_time, end_time, limit):
+        """
+        one request of oldest candles from start_time,
+        returns candles and start time of next page (0 when reached end_time or recent candle)
+        """
+        limit = max(1, min(limit, 1000))
+        time_args = {}
+        if start_time:
+            time_args['startTime'] = start_time
+        if end_time:
+            time_args['endTime'] = end_time
+        data = self.spot.klines(symbol, interval, limit=limit, **time_args)
+        if len(data) < limit or not start_time:
+            return data, 0
+        return data, data[-1][6] + 1
+
     async def klines(self, symbol, interval, **kwargs):
         # return recent data when either startTime or endTime is not set
         start_time = None if argkey.START_TIME not in kwargs else kwargs[argkey.START_TIME]
@@ -74,9 +74,11 @@ async def _get_listed_time(symbol: str, db: Database):
     return 0
 
 
-async def create_symbol_info(market: str, db: Database, d) -> SymbolInfo:
+async def create_symbol_info(market: str, db: Database, d, listed_time: int = -1) -> SymbolInfo:
     # convert binance exchange symbol information to SymbolInfo
-    listed_time = await _get_listed_time(d['symbol'], db)
+    # listed_time is looked up from db when it is not given
+    if listed_time < 0:
+        listed_time = await _get_listed_time(d['symbol'], db)
     return SymbolInfo(
         market,
         d['symbol'].lower(),
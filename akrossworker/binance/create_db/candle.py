@@ -10,6 +10,7 @@ from akrossworker.binance.api.spot_rest import BinanceSpotRest
 from akross.common import aktime
 from akrossworker.common.args_constants import TradingStatus
 from akrossworker.common.db import DBEnum, Database
+from akrossworker.common.watermark import WatermarkCatalog
 from akrossworker.common.protocol import (
     PriceCandleProtocol,
     SymbolInfo
@@ -51,6 +52,8 @@ async def main() -> None:
     spot = BinanceSpotRest()
     exchange_info = spot.exchange_info()
     db = Database()
+    catalog = WatermarkCatalog(db, DBEnum.BINANCE_QUOTE_DB)
+    await catalog.load()
     symbol_infos: List[SymbolInfo] = []
     now = aktime.get_msec()
     if 'symbols' in exchange_info:
@@ -73,10 +76,10 @@ async def main() -> None:
         for interval in intervals:
             col = symbol_info.symbol.lower() + '_' + interval
             interval_start_time = start_time
-            # await db.drop_collection(DBEnum.BINANCE_QUOTE_DB, col)
-            latest_data = await db.find_latest(DBEnum.BINANCE_QUOTE_DB, col, 1)
-            if len(latest_data) > 0:
-                interval_start_time = latest_data[-1]['endTime'] + 1
+            # await catalog.drop(col)
+            latest_time = await catalog.find_latest_ms(col)
+            if latest_time > 0:
+                interval_start_time = latest_time + 1
 
             query = {
                 'startTime': interval_start_time,
@@ -101,7 +104,7 @@ async def main() -> None:
 
             if len(record_data) > 0:
                 LOGGER.warning('write to db(%s)', interval)
-                await db.insert_many(DBEnum.BINANCE_QUOTE_DB, col, record_data)
+                await catalog.insert_candles(col, record_data)
                 LOGGER.warning('write to db done')
         LOGGER.warning('done %s', symbol_info.symbol.upper())
 
@@ -1,15 +1,24 @@
 import asyncio
 import logging
+import os
 import sys
-from typing import Dict
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
 
 from akross.common import env
 from akross.connection.aio.quote_channel import QuoteChannel, Market
 from akross.common import enums, util
 from akrossworker.common.candle_cache import CandleCache
+from akrossworker.common.metrics import TOTAL, RequestMetrics, summarize
+from akrossworker.common.shard import SHARD_COUNT, create_router, shard_of
+from akrossworker.common.symbol_info_cache import SymbolInfoCache
+from akrossworker.common.symbol_search import SymbolSearchIndex
+from akrossworker.common.warmup import RequestCounter, WarmupScheduler
 from akrossworker.common.command import ApiCommand
 from akrossworker.common.db import DBEnum, Database
 from akrossworker.common.args_constants import ApiArgKey as Args
+from akrossworker.common.args_constants import CandleFormat
 from akrossworker.common.protocol import (
     SymbolInfo
 )
@@ -18,22 +27,55 @@ from akross.rpc.base import RpcBase
 
 LOGGER = logging.getLogger(__name__)
 MARKET_NAME = 'binance.spot'
+TICK_STAT_INTERVAL = 600
+SNAPSHOT_INTERVAL = 1800
+# lazy mode fetches candles of a symbol on its first candle request
+# and unloads least recently requested symbols which are idle or over memory budget
+LAZY_LOAD = os.getenv('AKROSS_BINANCE_LAZY_LOAD', '0') == '1'
+MEMORY_BUDGET_MB = int(os.getenv('AKROSS_BINANCE_MEMORY_BUDGET_MB', '2048'))
+IDLE_TIMEOUT = int(os.getenv('AKROSS_BINANCE_IDLE_TIMEOUT', '3600'))
+EVICT_INTERVAL = 60
 
 
 class BinanceRestCache(RpcBase):
-    def __init__(self):
+    def __init__(
+        self,
+        lazy: bool = LAZY_LOAD,
+        memory_budget: int = MEMORY_BUDGET_MB * 1024 * 1024,
+        idle_timeout: int = IDLE_TIMEOUT,
+        shard_index: int = 0,
+        shard_count: int = 1
+    ):
         super().__init__()
         self.candle = self.on_candle
         self.symbolInfo = self.on_symbol_info
         self.search = self.on_search
         self.orderbook = self.on_orderbook
+        self.cacheStat = self.on_cache_stat
 
         self._worker: Market = None
         self._symbols: Dict[str, CandleCache] = {}
+        self._symbol_infos: Dict[str, SymbolInfo] = {}
+        self._search_index = SymbolSearchIndex([])
+        self._symbol_info_payload = SymbolInfoCache()
+        self._metrics = RequestMetrics()
+        self._lazy = lazy
+        self._memory_budget = memory_budget
+        self._idle_timeout = idle_timeout
+        # candles of symbols in other shards are not loaded, symbol master is kept for search
+        self._shard_index = shard_index
+        self._shard_count = shard_count
+        # loaded symbols from least recently requested one
+        self._last_access: Dict[str, float] = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        self._scheduler: Optional[WarmupScheduler] = None
         self._conn = QuoteChannel(MARKET_NAME)
         self._db = Database()
+        self._request_counter = RequestCounter(self._db, DBEnum.BINANCE_QUOTE_DB)
 
     async def preload(self):
+        asyncio.create_task(self._report_tick_stat())
+        asyncio.create_task(self._save_snapshots())
         await self._conn.connect()
         await self._conn.market_discovery()
         await self._conn.wait_for_market(MARKET_NAME)
@@ -43,6 +85,32 @@ class BinanceRestCache(RpcBase):
             sys.exit(1)
         self._worker = binance[0]
         await self.regist_symbols()
+        if self._lazy:
+            asyncio.create_task(self._evict_idle())
+
+    async def _report_tick_stat(self):
+        while True:
+            await asyncio.sleep(TICK_STAT_INTERVAL)
+            stats = sorted([cache.get_tick_stat() for cache in self._symbols.values()],
+                           key=lambda stat: stat['elapsedMs'], reverse=True)
+            LOGGER.warning('tick cpu top symbols %s', stats[:10])
+            LOGGER.warning('cache metrics %s', self.get_cache_stat())
+            await self._request_counter.flush()
+
+    async def save_snapshots(self) -> None:
+        started = time.monotonic()
+        for cache in list(self._symbols.values()):
+            try:
+                await cache.save_snapshot()
+            except OSError as e:
+                LOGGER.error('cannot save snapshot(%s) %s', cache.symbol_info.symbol, str(e))
+        LOGGER.warning('snapshot saved %d symbols in %.1fs',
+                       len(self._symbols), time.monotonic() - started)
+
+    async def _save_snapshots(self):
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+            await self.save_snapshots()
 
     async def regist_symbols(self) -> None:
         ret, symbols = await self._conn.api_call(
@@ -51,16 +119,75 @@ class BinanceRestCache(RpcBase):
             LOGGER.error('no symbols')
             sys.exit(1)
 
-        for i, symbol in enumerate(symbols):
-            LOGGER.warning('%d/%d', i+1, len(symbols))
+        self._scheduler = WarmupScheduler()
+        caches = []
+        for symbol in symbols:
             symbol_info = SymbolInfo.CreateSymbolInfo(symbol)
+            self._symbol_infos[symbol_info.symbol.lower()] = symbol_info
+            if shard_of(symbol_info.symbol, self._shard_count) != self._shard_index:
+                continue
+            if not self._lazy and symbol_info.symbol not in self._symbols:
+                caches.append(self._create_cache(symbol_info.symbol.lower()))
+        self._search_index = SymbolSearchIndex(self._symbol_infos.values())
+        self._symbol_info_payload.update(self._symbol_infos.values())
+
+        if len(caches) > 0:
+            counts = await self._request_counter.load()
+            failed = await self._scheduler.run(self._request_counter.sort_by_count(caches, counts))
+            for cache in failed:
+                del self._symbols[cache.symbol_info.symbol.lower()]
+
+    def _create_cache(self, symbol: str) -> CandleCache:
+        self._symbols[symbol] = CandleCache(
+            self._db, DBEnum.BINANCE_QUOTE_DB,
+            self._conn, self._worker, self._symbol_infos[symbol], metrics=self._metrics)
+        return self._symbols[symbol]
+
+    async def _get_cache(self, symbol: str) -> Optional[CandleCache]:
+        if (not self._lazy or symbol not in self._symbol_infos or
+                shard_of(symbol, self._shard_count) != self._shard_index):
+            return self._symbols.get(symbol)
+
+        cache = self._symbols[symbol] if symbol in self._symbols else self._create_cache(symbol)
+        if not cache.fetch_done:
+            # requests of loading symbol wait for the same fetch
+            if symbol not in self._loading:
+                task = asyncio.create_task(self._load(cache))
+                # removed by the task itself, cancelled waiter does not start another fetch
+                task.add_done_callback(lambda _: self._loading.pop(symbol, None))
+                self._loading[symbol] = task
+            await asyncio.shield(self._loading[symbol])
+        self._last_access[symbol] = time.monotonic()
+        self._last_access.move_to_end(symbol)
+        self._evict(symbol)
+        return cache
 
-            if symbol_info.symbol not in self._symbols:
-                symbol_name = symbol_info.symbol.lower()
-                self._symbols[symbol_name] = \
-                    CandleCache(self._db, DBEnum.BINANCE_QUOTE_DB,
-                                self._conn, self._worker, symbol_info)
-                await self._symbols[symbol_name].run()
+    async def _load(self, cache: CandleCache) -> None:
+        try:
+            await cache.run(self._scheduler)
+        except Exception:
+            # partially fetched candles are released, next request fetches again
+            cache.unload()
+            raise
+
+    def _evict(self, keep: str = '') -> None:
+        now = time.monotonic()
+        total = sum(self._symbols[symbol].nbytes() for symbol in self._last_access)
+        for symbol, accessed in list(self._last_access.items()):
+            if total <= self._memory_budget and now - accessed < self._idle_timeout:
+                break
+            elif symbol == keep:
+                continue
+            cache = self._symbols[symbol]
+            total -= cache.nbytes()
+            cache.unload()
+            del self._last_access[symbol]
+            LOGGER.info('unload %s, cache memory %d bytes', symbol, total)
+
+    async def _evict_idle(self):
+        while True:
+            await asyncio.sleep(EVICT_INTERVAL)
+            self._evict()
 
     async def on_orderbook(self, **kwargs):
         util.check_required_parameters(kwargs, 'symbol')
@@ -73,17 +200,39 @@ class BinanceRestCache(RpcBase):
         
         interval = kwargs['interval']
         symbol = kwargs['symbol'].lower()
-        if symbol in self._symbols:
-            data = self._symbols[symbol].get_data(interval)
-            data = data[-700000:]
-            return data
+        cache = await self._get_cache(symbol)
+        if cache is not None:
+            self._request_counter.add(symbol)
+            with self._metrics.measure(TOTAL):
+                if Args.PAGE_SIZE in kwargs:
+                    return cache.get_page(
+                        interval,
+                        kwargs.get(Args.START_TIME, 0),
+                        kwargs.get(Args.END_TIME, 0),
+                        int(kwargs[Args.PAGE_SIZE]),
+                        kwargs.get(Args.CANDLE_FORMAT, CandleFormat.Legacy),
+                        kwargs.get(Args.CURSOR, '')
+                    )
+                return cache.get_response(
+                    interval,
+                    kwargs.get(Args.START_TIME, 0),
+                    kwargs.get(Args.END_TIME, 0),
+                    kwargs.get(Args.CANDLE_COUNT, 0),
+                    kwargs.get(Args.CANDLE_FORMAT, CandleFormat.Legacy)
+                )
         return []
 
+    def get_cache_stat(self) -> dict:
+        return summarize([cache.get_metrics() for cache in self._symbols.values()], self._metrics)
+
+    async def on_cache_stat(self, **kwargs):
+        if 'symbol' in kwargs:
+            symbol = kwargs['symbol'].lower()
+            return self._symbols[symbol].get_metrics() if symbol in self._symbols else {}
+        return self.get_cache_stat()
+
     async def on_symbol_info(self, **kwargs):
-        result = []
-        for symbol in self._symbols.values():
-            result.append(symbol.get_symbol_info().to_network())
-        return result
+        return self._symbol_info_payload.get(kwargs.get(Args.STATUS), kwargs.get(Args.SECTORS))
 
     async def on_search(self, **kwargs):
         LOGGER.info(
@@ -91,19 +240,29 @@ class BinanceRestCache(RpcBase):
             kwargs[Args.KEYWORD] if Args.KEYWORD in kwargs else 'no keyword',
             kwargs[Args.SECTORS] if Args.SECTORS in kwargs else 'no sectors'
         )
-        result = []
-        for symbol in self._symbols.values():
-            if symbol.symbol_matched(**kwargs):
-                result.append(symbol.get_symbol_info().to_network())
-        return result
+        symbol_infos = self._search_index.search(
+            kwargs.get(Args.KEYWORD),
+            kwargs.get(Args.SECTORS),
+            int(kwargs.get(Args.LIMIT, 0))
+        )
+        return [symbol_info.to_network() for symbol_info in symbol_infos]
+
+
+def create_shard(shard_index: int, shard_count: int) -> BinanceRestCache:
+    return BinanceRestCache(shard_index=shard_index, shard_count=shard_count)
 
 
 async def main() -> None:
     LOGGER.warning('run rest provider')
     conn = QuoteChannel('binance.spot', env.get_rmq_url())
 
-    rest_provider = BinanceRestCache()
-    await rest_provider.preload()
+    if SHARD_COUNT > 1:
+        rest_provider = await create_router(
+            create_shard, SHARD_COUNT,
+            ['candle', 'orderbook', 'cacheStat'], {}, ['symbolInfo', 'search'])
+    else:
+        rest_provider = BinanceRestCache()
+        await rest_provider.preload()
     await conn.connect()
     await conn.run_with_bus_queue(enums.WorkerType.Cache, rest_provider)
     await asyncio.get_running_loop().create_future()
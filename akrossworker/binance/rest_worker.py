@@ -1,5 +1,7 @@
 import asyncio
 import logging
+import time
+from typing import Dict
 
 from akross.connection.aio.quote_channel import QuoteChannel
 from akross.common import enums, util
@@ -8,14 +10,18 @@ from akross.rpc.base import RpcBase
 from akrossworker.common.db import Database
 from akrossworker.common.protocol import (
     OrderbookStreamProtocol,
-    PriceCandleProtocol
+    PriceCandleProtocol,
+    SymbolInfo
 )
+from akrossworker.common.symbol_info_cache import SymbolInfoCache
 from akrossworker.binance.api.spot_rest import BinanceSpotRest
 from akrossworker.binance.api.utils import create_symbol_info
 from akrossworker.common.args_constants import ApiArgKey as apikey
 
 
 LOGGER = logging.getLogger(__name__)
+# exchange info is fetched again when cached one is older than this
+SYMBOL_INFO_REFRESH = 600
 
 
 class BinanceRestWorker(RpcBase):
@@ -31,6 +37,11 @@ class BinanceRestWorker(RpcBase):
         ]
         self._db = Database()
         self._spot = BinanceSpotRest()
+        self._symbol_info = SymbolInfoCache()
+        self._symbol_info_updated = 0
+        self._symbol_info_lock = asyncio.Lock()
+        # listed time of a symbol does not change, keep it after first lookup
+        self._symbol_infos: Dict[str, SymbolInfo] = {}
 
     async def on_orderbook(self, **kwargs):
         util.check_required_parameters(kwargs, 'symbol')
@@ -62,35 +73,70 @@ class BinanceRestWorker(RpcBase):
         if apikey.END_TIME in kwargs and kwargs[apikey.END_TIME] != 0:
             time_args[apikey.END_TIME] = kwargs[apikey.END_TIME]
 
+        if apikey.PAGE_SIZE in kwargs:
+            try:
+                res, next_time = self._spot.klines_page(
+                    symbol, interval,
+                    time_args.get(apikey.START_TIME, 0),
+                    time_args.get(apikey.END_TIME, 0),
+                    int(kwargs[apikey.PAGE_SIZE]))
+            except Exception as e:
+                LOGGER.error(f'binance service raise error {str(e)}')
+                return {'data': [], 'next': 0}
+            return {'data': self._to_network(res), 'next': next_time}
+
         # default is 500, max: 1000
         try:
             res = await self._spot.klines(symbol, interval, limit=1000, **time_args)
         except Exception as e:
             LOGGER.error(f'binance service raise error {str(e)}')
             # raise akross.ResponseError(f'binance service raise error {str(e)}')
-        protocol_result = []
         # rabbitmq msg cannot exceed 128MB
         res = res[-700000:]
+        protocol_result = self._to_network(res)
+        LOGGER.warning('on_history done %s', kwargs)
+
+        return protocol_result
 
-        for data in res:
+    def _to_network(self, klines: list) -> list:
+        protocol_result = []
+        for data in klines:
             adqp = PriceCandleProtocol.CreatePriceCandle(
                 data[1], data[2], data[3], data[4],
                 data[0], data[6], data[5], data[7]
             )
             protocol_result.append(adqp.to_network())
-        LOGGER.warning('on_history done %s', kwargs)
-
         return protocol_result
 
-    async def on_symbol_info(self, **kwargs):
-        result = []
+    async def _refresh_symbol_info(self) -> None:
         exchange_info = self._spot.exchange_info()
-        if 'symbols' in exchange_info:
-            for d in exchange_info['symbols']:
+        if 'symbols' not in exchange_info:
+            return
+
+        symbol_infos = []
+        for d in exchange_info['symbols']:
+            symbol = d['symbol'].lower()
+            if symbol in self._symbol_infos:
+                listed = self._symbol_infos[symbol].listed
+                symbol_info = await create_symbol_info('binance.spot', None, d, listed)
+            else:
                 symbol_info = await create_symbol_info('binance.spot', self._db, d)
-                result.append(symbol_info.to_network())
+            self._symbol_infos[symbol] = symbol_info
+            symbol_infos.append(symbol_info)
+        if self._symbol_info.update(symbol_infos):
+            LOGGER.warning('symbol info changed, version %d(%d symbols)',
+                           self._symbol_info.version, len(symbol_infos))
+        self._symbol_info_updated = time.monotonic()
 
-        return result
+    async def on_symbol_info(self, **kwargs):
+        async with self._symbol_info_lock:
+            if (self._symbol_info_updated == 0 or
+                    time.monotonic() - self._symbol_info_updated > SYMBOL_INFO_REFRESH):
+                try:
+                    await self._refresh_symbol_info()
+                except Exception as e:
+                    LOGGER.error('cannot get exchange info %s', str(e))
+        return self._symbol_info.get(kwargs.get(apikey.STATUS), kwargs.get(apikey.SECTORS))
 
 
 async def main() -> None:
@@ -4,9 +4,23 @@ class ApiArgKey:
     CANDLE_COUNT = 'count'
     START_TIME = 'startTime'
     END_TIME = 'endTime'
+    CANDLE_FORMAT = 'format'
+    PAGE_SIZE = 'pageSize'
+    CURSOR = 'cursor'
 
     SECTORS = 'sectors'
+    STATUS = 'status'
     KEYWORD = 'keyword'
+    LIMIT = 'limit'
+
+
+class CandleFormat:
+    """
+    Legacy: list of 10 string items per candle
+    Columnar: base64 of packed numeric columns, see common/candle_codec.py
+    """
+    Legacy = 'legacy'
+    Columnar = 'columnar'
 
 
 class TradingStatus:
@@ -1,5 +1,7 @@
 import logging
-from typing import List
+from typing import List, Optional
+
+import numpy
 
 from akross.connection.aio.quote_channel import QuoteChannel, Market
 from akross.common import aktime
@@ -7,6 +9,7 @@ from akrossworker.common.args_constants import (
     CandleLimitDays
 )
 from akrossworker.common import grouping
+from akrossworker.common.candle_store import CandleStore, DATABASE_PROJECTION
 
 from akrossworker.common.db import Database
 from akrossworker.common.protocol import (
@@ -14,6 +17,7 @@ from akrossworker.common.protocol import (
     PriceStreamProtocol,
     SymbolInfo
 )
+from akrossworker.common.volatility_calculator import VolatilityCalculator
 
 
 LOGGER = logging.getLogger(__name__)
@@ -37,8 +41,9 @@ class RealtimeCandle:
         self.interval_type = 'm'
         self.fetch_done = False
         self.last_price = 0
-        self.data: List[PriceCandleProtocol] = []
+        self.data = CandleStore()
         self.start_time = start_time
+        self.volatility_calculator = VolatilityCalculator(start_time)
 
     def get_db_start_search(self) -> int:
         return aktime.get_msec_before_day(
@@ -50,52 +55,49 @@ class RealtimeCandle:
     def get_last_price(self) -> float:
         return self.last_price
 
+    def get_volatility_calc(self) -> Optional[VolatilityCalculator]:
+        return self.volatility_calculator
+
     def get_data(self, interval: int) -> list:
         return grouping.get_candle(
             self.data, self.interval_type, interval)
 
     def get_data_until_now(self, start_time: int) -> List[PriceCandleProtocol]:
-        result = []
-        for data in self.data:
-            if data.start_time > start_time:
-                result.append(data)
-        return result
+        return [self.data[i] for i in numpy.flatnonzero(self.data.start_times > start_time)]
 
-    def get_raw_candle(self) -> List[PriceCandleProtocol]:
+    def get_raw_candle(self) -> CandleStore:
         return self.data
 
-    def _create_new_candle(self, stream: PriceStreamProtocol, is_same_type=True) -> PriceCandleProtocol:
+    def _create_new_candle(self, stream: PriceStreamProtocol, is_same_type=True) -> None:
         if is_same_type:
             start_time = aktime.get_start_time(stream.event_time, 'm', 'KRX')
         else:
             start_time = stream.event_time
 
         end_time = aktime.get_start_time(stream.event_time, 'm', 'KRX') + aktime.interval_type_to_msec('m') - 1
-        return PriceCandleProtocol(
-            int(stream.price), int(stream.price), int(stream.price), int(stream.price),
+        if len(self.data) > 0:
+            self.volatility_calculator.add_complete_candle(self.data[-1])
+        price = int(stream.price)
+        self.data.append(
+            price, price, price, price,
             start_time, end_time,
-            int(stream.volume), int(stream.volume) * int(stream.price), stream.time_type, False)
+            int(stream.volume), int(stream.volume) * price, stream.time_type, False)
 
     def add_stream(self, stream: PriceStreamProtocol):
         self.last_price = float(stream.price)
+        self.volatility_calculator.update_amount(stream)
         if len(self.data) == 0:
-            self.data.append(self._create_new_candle(stream))
+            self._create_new_candle(stream)
         else:
-            last_candle = self.data[-1]
-            last_end_time = last_candle.end_time
-            last_start_time = last_candle.start_time
+            last_end_time = self.data.end_time_at(-1)
+            last_start_time = self.data.start_time_at(-1)
             if last_end_time < stream.event_time:
-                self.data.append(self._create_new_candle(stream))
-            elif last_candle.time_type != stream.time_type:
-                self.data.append(self._create_new_candle(stream, False))
+                self._create_new_candle(stream)
+            elif self.data.time_type_at(-1) != stream.time_type:
+                self._create_new_candle(stream, False)
             elif last_start_time <= stream.event_time:
-                last_candle.price_close = int(stream.price)
-                if int(stream.price) > int(last_candle.price_high):
-                    last_candle.price_high = int(stream.price)
-                if int(stream.price) < int(last_candle.price_low):
-                    last_candle.price_low = int(stream.price)
-                last_candle.add_base_asset_volume(stream.volume)
-                last_candle.add_quote_asset_volume(int(stream.price) * int(stream.volume))
+                price = int(stream.price)
+                self.data.update_last(price, float(stream.volume), price * int(stream.volume))
 
     async def fetch(self):
         """
@@ -103,11 +105,10 @@ class RealtimeCandle:
         """
         col = self.symbol_info.symbol.lower() + '_1' + self.interval_type
         LOGGER.info('%s', col)
-        stored = await self.db.get_data(
+        async for batch in self.db.get_raw_batches(
             self.db_name, col,
-            {'endTime': {'$gte': self.get_db_start_search(), '$lt': self.start_time}}
-        )
-
-        for data in stored:
-            candle = PriceCandleProtocol.ParseDatabase(data)
-            self.data.append(candle)
+            {'endTime': {'$gte': self.get_db_start_search(), '$lt': self.start_time}},
+            DATABASE_PROJECTION
+        ):
+            self.data.extend_database_batch(batch)
+        self.volatility_calculator.add_complete_store(self.data)
@@ -1,6 +1,8 @@
 import logging
 from typing import List
 
+import numpy
+
 from akross.connection.aio.quote_channel import QuoteChannel, Market
 from akross.common import aktime
 from akrossworker.common.args_constants import (
@@ -8,6 +10,7 @@ from akrossworker.common.args_constants import (
 )
 
 from akrossworker.common import grouping
+from akrossworker.common.candle_store import CandleStore, DATABASE_PROJECTION
 
 from akrossworker.common.db import Database
 from akrossworker.common.protocol import (
@@ -37,7 +40,7 @@ class TimeFrameCandle:
         self.db_name = db_name
         self.interval_type = interval_type
         self.fetch_done = False
-        self.data: List[PriceCandleProtocol] = []
+        self.data = CandleStore()
         self.start_time = start_time
         self.end_time = end_time
         self.next_index = 0
@@ -55,31 +58,24 @@ class TimeFrameCandle:
         return grouping.get_candle(
             self.data[:self.next_index], self.interval_type, interval)
 
-    def get_raw_candle(self) -> List[PriceCandleProtocol]:
+    def get_raw_candle(self) -> CandleStore:
         return self.data
 
     def get_data_until_now(self, start_time: int) -> List[PriceCandleProtocol]:
-        result = []
-        for data in self.data[:self.next_index]:
-            if data.start_time > start_time:
-                result.append(data)
-        return result
+        passed = self.data[:self.next_index]
+        return [passed[i] for i in numpy.flatnonzero(passed.start_times > start_time)]
 
     def _set_current_time(self, ms: int) -> None:
-        for i, candle in enumerate(self.data):
-            if candle.start_time >= ms:
-                self.next_index = i
-                break
+        found = numpy.flatnonzero(self.data.start_times >= ms)
+        if len(found) > 0:
+            self.next_index = int(found[0])
 
     def next(self, ms: int) -> List[PriceCandleProtocol]:
-        result = []
-        for candle in self.data[self.next_index:]:
-            if candle.start_time <= ms:
-                result.append(candle)
-                self.next_index += 1
-            else:
-                break
-        return result
+        remain = self.data[self.next_index:]
+        stop = numpy.flatnonzero(remain.start_times > ms)
+        count = int(stop[0]) if len(stop) > 0 else len(remain)
+        self.next_index += count
+        return remain[:count].to_candles()
 
     async def fetch(self):
         """
@@ -87,17 +83,15 @@ class TimeFrameCandle:
         """
         col = self.symbol_info.symbol.lower() + '_1' + self.interval_type
         LOGGER.info('%s', col)
-        stored = await self.db.get_data(
+        async for batch in self.db.get_raw_batches(
             self.db_name, col,
             {
                 'endTime': {'$gte': self.get_db_start_search()},
                 'startTime': {'$lte': self.end_time}
-            }
-        )
-
-        for data in stored:
-            candle = PriceCandleProtocol.ParseDatabase(data)
-            self.data.append(candle)
+            },
+            DATABASE_PROJECTION
+        ):
+            self.data.extend_database_batch(batch)
 
         self._set_current_time(self.start_time)
         # only use database data for a speed
\ No newline at end of file
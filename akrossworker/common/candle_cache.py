@@ -1,29 +1,109 @@
-from typing import Dict, List, Union
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
 
 from akross.connection.aio.quote_channel import QuoteChannel, Market
 from akross.common import aktime
+from akrossworker.common import candle_codec, grouping
+from akrossworker.common.metrics import AGGREGATION, SERIALIZATION, LatencyHistogram, RequestMetrics
+from akrossworker.common.ranking import RankingBoard, TRIANGLE_SCORE, amount_ratio_key
 from akrossworker.common.unit_candle import UnitCandle
+from akrossworker.common.candle_store import CandleStore
+from akrossworker.common.candle_view import CandleView
 from akrossworker.common.db import Database
-from akrossworker.common.protocol import SymbolInfo
+from akrossworker.common.protocol import PriceStreamProtocol, SymbolInfo
 from akrossworker.common.command import ApiCommand
 from akrossworker.common.args_constants import ApiArgKey as Args
+from akrossworker.common.args_constants import CandleFormat, TickTimeType
+from akrossworker.common.warmup import WarmupScheduler
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _is_sector_matched(symbol_info: SymbolInfo, sectors: Union[List[str], str]):
+    sectors = sectors if isinstance(sectors, list) else [sectors]
+    if set(sectors).issubset(symbol_info.sectors):
+        return True
+    return False
+
+
+def _name_matched(symbol_info: SymbolInfo, keyword: str):
+    keyword = keyword.lower()
+    if keyword in symbol_info.symbol.lower():
+        return True
+    if keyword in symbol_info.desc.lower():
+        return True
+    return False
+
+
+def symbol_matched(symbol_info: SymbolInfo, **kwargs):
+    if Args.KEYWORD in kwargs and Args.SECTORS in kwargs:
+        return (_is_sector_matched(symbol_info, kwargs[Args.SECTORS]) and
+                _name_matched(symbol_info, kwargs[Args.KEYWORD]))
+    elif Args.KEYWORD in kwargs:
+        return _name_matched(symbol_info, kwargs[Args.KEYWORD])
+    elif Args.SECTORS in kwargs:
+        return _is_sector_matched(symbol_info, kwargs[Args.SECTORS])
+    return False
+
+
+# candles are saved here periodically and restored on start if database has same candles,
+# disabled by default, e.g. ~/.akross/snapshot
+SNAPSHOT_DIR = os.getenv('AKROSS_CACHE_SNAPSHOT_DIR', '')
+# ticks of a symbol arrived in this milliseconds are applied at once, 0 applies each tick
+TICK_BATCH_MS = int(os.getenv('AKROSS_TICK_BATCH_MS', '0'))
 
 
 class CandleCache:
+    # number of aggregated (interval_type, interval) views kept per symbol
+    MAX_VIEWS = 8
+    # rabbitmq msg cannot exceed 128MB
+    MAX_RESPONSE_COUNT = 700000
+    # ticks per second is measured over at least this seconds
+    TICK_RATE_WINDOW = 60
+
     def __init__(
         self,
         db: Database,
         db_name: str,
         conn: QuoteChannel,
         market: Market,
-        symbol_info: SymbolInfo
+        symbol_info: SymbolInfo,
+        ranking: Optional[RankingBoard] = None,
+        metrics: Optional[RequestMetrics] = None
     ):
+        self.db = db
+        self.db_name = db_name
         self.conn = conn
         self.market = market
         self.symbol_info = symbol_info
         self.default_intervals = ['m', 'h', 'd', 'w', 'M']
         self.candles: Dict[str, UnitCandle] = {}
+        self.views: Dict[Tuple[str, int], CandleView] = OrderedDict()
+        self.fetch_done = False
+        self.subscribed = False
+        self.tick_count = 0
+        self.tick_elapsed_ns = 0
+        # tick apply time in microseconds, event time to apply in milliseconds
+        self.tick_latency = LatencyHistogram()
+        self.tick_lag = LatencyHistogram()
+        self._tick_rate_mark = (time.monotonic(), 0)
+        self.tick_rate = 0.0
+        self.tick_batch_ms = TICK_BATCH_MS
+        self._pending_streams: List[PriceStreamProtocol] = []
+        self.ranking = ranking
+        self.metrics = metrics if metrics is not None else RequestMetrics()
+        try:
+            self.market_cap = int(symbol_info.market_cap)
+        except (TypeError, ValueError):
+            self.market_cap = 0
         self.create_candles(db, db_name)
+        # candles are created from minute to month, tick is applied in the same order
+        self.tick_candles: List[UnitCandle] = list(self.candles.values())
 
     def create_candles(self, db, db_name):
         for interval_type in self.default_intervals:
@@ -41,7 +121,7 @@ class CandleCache:
         volatility_calc = min_unit_candle.get_volatility_calc()
         if volatility_calc is not None:
             return volatility_calc.get_triangle_score(
-                (day_candles[-2].price_close), (day_candles[-1].price_close))
+                day_candles.price_close_at(-2), day_candles.price_close_at(-1))
         return 0
 
     def get_amount(self, time_type: str) -> int:
@@ -51,12 +131,163 @@ class CandleCache:
             return volatility_calc.get_amount(time_type)
         return 0
 
-    def get_data(self, interval: str):
+    def dissect_interval(self, interval: str) -> Tuple[str, int]:
         interval, interval_type = aktime.interval_dissect(interval)
+        return interval_type, interval
 
-        if interval_type in self.candles:
-            return self.candles[interval_type].get_candle(interval)
-        return []
+    def get_data(self, interval: str):
+        return self.get_grouped_data(*self.dissect_interval(interval))
+
+    def get_store(self, interval: str) -> CandleStore:
+        return self.get_grouped_store(*self.dissect_interval(interval))
+
+    def get_page(
+        self,
+        interval: str,
+        start_time: int,
+        end_time: int,
+        page_size: int,
+        candle_format: str = CandleFormat.Legacy,
+        cursor: str = ''
+    ) -> dict:
+        """
+        oldest page_size candles which start in [start_time, end_time], 0 means unbounded.
+        'next' of response is cursor of the next page, '' when there is no more page.
+        aggregated candles can start at the same time, so cursor is a row of the view
+        instead of a start time, start_time is ignored when cursor is given
+        """
+        with self.metrics.measure(AGGREGATION):
+            store, generation, first_row = self._get_page_store(interval)
+            if cursor:
+                first, last = grouping.find_window(store.start_times, 0, end_time)
+                # rows trimmed from the view after previous page are skipped
+                first = min(max(self._parse_cursor(cursor, generation) - first_row, 0), last)
+            else:
+                first, last = grouping.find_window(store.start_times, start_time, end_time)
+            stop = min(last, first + max(1, min(page_size, self.MAX_RESPONSE_COUNT)))
+            page = store[first:stop]
+
+        with self.metrics.measure(SERIALIZATION):
+            if candle_format == CandleFormat.Columnar:
+                response = candle_codec.to_response(page)
+            else:
+                response = {'data': page.to_network()}
+        response['next'] = '%d-%d' % (generation, first_row + stop) if stop < last else ''
+        return response
+
+    def _get_page_store(self, interval: str) -> Tuple[CandleStore, int, int]:
+        """
+        aggregated candles with generation and first row number of the view,
+        generation is 0 while candles are fetched and there is no view
+        """
+        interval_type, interval = self.dissect_interval(interval)
+        if interval_type not in self.candles or interval < 1:
+            return CandleStore(), 0, 0
+
+        unit_candle = self.candles[interval_type]
+        if not unit_candle.fetch_done:
+            return grouping.aggregate(unit_candle.data, interval_type, interval), 0, 0
+        view = self._get_view(unit_candle, interval)
+        store = view.get_snapshot()
+        return store, view.generation, view.first_row
+
+    @staticmethod
+    def _parse_cursor(cursor: str, generation: int) -> int:
+        try:
+            cursor_generation, row = (int(value) for value in cursor.split('-'))
+        except ValueError:
+            raise ValueError('invalid page cursor %s' % cursor)
+        if cursor_generation != generation:
+            raise ValueError('page cursor %s is expired, request from the first page' % cursor)
+        return row
+
+    def get_response(
+        self,
+        interval: str,
+        start_time: int = 0,
+        end_time: int = 0,
+        count: int = 0,
+        candle_format: str = CandleFormat.Legacy
+    ) -> Union[list, dict]:
+        """
+        candle response of rest cache, latest MAX_RESPONSE_COUNT candles at most
+        """
+        columnar = candle_format == CandleFormat.Columnar
+        window = any((start_time, end_time, count))
+        if not columnar and not window:
+            # legacy network list is cached in view and measured in get_grouped_data
+            data = self.get_data(interval)
+        else:
+            with self.metrics.measure(AGGREGATION):
+                if window:
+                    data = self.get_window(interval, start_time, end_time, count)
+                else:
+                    data = self.get_store(interval)
+
+        if len(data) > self.MAX_RESPONSE_COUNT:
+            LOGGER.warning('candle response of %s(%s) is truncated from %d, use %s to get all',
+                           self.symbol_info.symbol, interval, len(data), Args.PAGE_SIZE)
+            data = data[-self.MAX_RESPONSE_COUNT:]
+        if isinstance(data, list):
+            return data
+        with self.metrics.measure(SERIALIZATION):
+            return candle_codec.to_response(data) if columnar else data.to_network()
+
+    def get_window(
+        self,
+        interval: str,
+        start_time: int = 0,
+        end_time: int = 0,
+        count: int = 0
+    ) -> CandleStore:
+        """
+        aggregated candles which start in [start_time, end_time], last count candles when count is set
+        """
+        interval_type, interval = self.dissect_interval(interval)
+        if interval_type not in self.candles or interval < 1:
+            return CandleStore()
+
+        unit_candle = self.candles[interval_type]
+        if not unit_candle.fetch_done:
+            return grouping.aggregate(
+                unit_candle.data, interval_type, interval, start_time, end_time, count)
+        store = self._get_view(unit_candle, interval).get_snapshot()
+        first, last = grouping.find_window(store.start_times, start_time, end_time, count)
+        return store[first:last]
+
+    def get_grouped_data(self, interval_type: str, interval: int) -> list:
+        if interval_type not in self.candles or interval < 1:
+            return []
+
+        unit_candle = self.candles[interval_type]
+        if not unit_candle.fetch_done:
+            return unit_candle.get_candle(interval)
+        view = self._get_view(unit_candle, interval)
+        with self.metrics.measure(AGGREGATION):
+            view.get_store()
+        with self.metrics.measure(SERIALIZATION):
+            return view.get_network()
+
+    def get_grouped_store(self, interval_type: str, interval: int) -> CandleStore:
+        if interval_type not in self.candles or interval < 1:
+            return CandleStore()
+
+        unit_candle = self.candles[interval_type]
+        if not unit_candle.fetch_done:
+            return grouping.aggregate(unit_candle.data, interval_type, interval)
+        return self._get_view(unit_candle, interval).get_snapshot()
+
+    def _get_view(self, unit_candle: UnitCandle, interval: int) -> CandleView:
+        key = (unit_candle.interval_type, interval)
+        if key in self.views:
+            self.views.move_to_end(key)
+            return self.views[key]
+
+        self.views[key] = unit_candle.create_view(interval)
+        while len(self.views) > self.MAX_VIEWS:
+            (interval_type, _), view = self.views.popitem(last=False)
+            self.candles[interval_type].remove_view(view)
+        return self.views[key]
 
     def get_interval_type_data(self, interval_type: str):
         if interval_type in self.candles:
@@ -67,41 +298,140 @@ class CandleCache:
         return self.symbol_info
 
     def symbol_matched(self, **kwargs):
-        if Args.KEYWORD in kwargs and Args.SECTORS in kwargs:
-            return (self._is_sector_matched(kwargs[Args.SECTORS]) and
-                    self._name_matched(kwargs[Args.KEYWORD]))
-        elif Args.KEYWORD in kwargs:
-            return self._name_matched(kwargs[Args.KEYWORD])
-        elif Args.SECTORS in kwargs:
-            return self._is_sector_matched(kwargs[Args.SECTORS])
-        return False
-
-    def _is_sector_matched(self, sectors: Union[List[str], str]):
-        sectors = sectors if isinstance(sectors, list) else [sectors]
-        if set(sectors).issubset(self.symbol_info.sectors):
-            return True
-        return False
-
-    def _name_matched(self, keyword: str):
-        keyword = keyword.lower()
-        if keyword in self.symbol_info.symbol.lower():
-            return True
-        if keyword in self.symbol_info.desc.lower():
-            return True
-        return False
+        return symbol_matched(self.symbol_info, **kwargs)
+
+    def nbytes(self) -> int:
+        return (sum(candle.data.nbytes for candle in self.candles.values()) +
+                sum(view.data.nbytes for view in self.views.values()))
+
+    def unload(self) -> None:
+        """
+        release candles, stream subscription is kept and ticks are ignored until next run
+        """
+        self.fetch_done = False
+        self._pending_streams = []
+        self.views.clear()
+        self.candles = {}
+        self.create_candles(self.db, self.db_name)
+        self.tick_candles = list(self.candles.values())
+
+    def get_tick_stat(self) -> dict:
+        return {
+            'symbol': self.symbol_info.symbol,
+            'ticks': self.tick_count,
+            'elapsedMs': self.tick_elapsed_ns / 1000000
+        }
+
+    def get_tick_rate(self) -> float:
+        now = time.monotonic()
+        marked, tick_count = self._tick_rate_mark
+        if now - marked >= self.TICK_RATE_WINDOW:
+            self.tick_rate = (self.tick_count - tick_count) / (now - marked)
+            self._tick_rate_mark = (now, self.tick_count)
+        return self.tick_rate
+
+    def get_metrics(self) -> dict:
+        return {
+            'symbol': self.symbol_info.symbol,
+            'fetchDone': self.fetch_done,
+            'candles': {interval_type: len(candle.data)
+                        for interval_type, candle in self.candles.items()},
+            'views': {f'{interval}{interval_type}': len(view.data)
+                      for (interval_type, interval), view in self.views.items()},
+            'bytes': self.nbytes(),
+            'ticks': self.tick_count,
+            'ticksPerSec': self.get_tick_rate(),
+            'tickLatencyUs': self.tick_latency.to_dict(),
+            'tickLagMs': self.tick_lag.to_dict()
+        }
+
+    def update_ranking(self, time_types: List[str]) -> None:
+        symbol = self.symbol_info.symbol.lower()
+        score = self.get_triangle_score()
+        if score > 0:
+            self.ranking.update(TRIANGLE_SCORE, symbol, score)
+        else:
+            self.ranking.remove(TRIANGLE_SCORE, symbol)
+
+        if self.market_cap > 0 and len(self.candles['m'].data) > 0:
+            for time_type in time_types:
+                self.ranking.update(
+                    amount_ratio_key(time_type), symbol,
+                    self.get_amount(time_type) / self.market_cap)
+
+    def apply_stream(self, stream: PriceStreamProtocol) -> None:
+        started = time.perf_counter_ns()
+        for candle in self.tick_candles:
+            candle.update_stream_data(stream)
+        if self.ranking is not None:
+            self.update_ranking([stream.time_type])
+        self.tick_count += 1
+        elapsed = time.perf_counter_ns() - started
+        self.tick_elapsed_ns += elapsed
+        self.tick_latency.add(elapsed // 1000)
+        self.tick_lag.add(time.time() * 1000 - stream.event_time)
+
+    def apply_streams(self, streams: List[PriceStreamProtocol]) -> None:
+        """
+        same result as apply_stream of each stream, tick latency is recorded once for a batch
+        """
+        started = time.perf_counter_ns()
+        for candle in self.tick_candles:
+            candle.update_stream_batch(streams)
+        if self.ranking is not None:
+            self.update_ranking(list(dict.fromkeys(stream.time_type for stream in streams)))
+        self.tick_count += len(streams)
+        elapsed = time.perf_counter_ns() - started
+        self.tick_elapsed_ns += elapsed
+        self.tick_latency.add(elapsed // 1000)
+        now = time.time() * 1000
+        for stream in streams:
+            self.tick_lag.add(now - stream.event_time)
+
+    def _apply_pending_streams(self) -> None:
+        streams, self._pending_streams = self._pending_streams, []
+        if self.fetch_done and len(streams) > 0:
+            self.apply_streams(streams)
 
     async def on_price_stream(self, msg):
-        for candle in self.candles.values():
-            await candle.update_stream_data(msg)
+        if not self.fetch_done:
+            return
+
+        stream = PriceStreamProtocol.ParseNetwork(msg)
+        if stream is None:
+            return
+        elif self.tick_batch_ms > 0:
+            self._pending_streams.append(stream)
+            if len(self._pending_streams) == 1:
+                asyncio.get_running_loop().call_later(
+                    self.tick_batch_ms / 1000, self._apply_pending_streams)
+        else:
+            self.apply_stream(stream)
+
+    async def save_snapshot(self, snapshot_dir: str = SNAPSHOT_DIR) -> None:
+        if not snapshot_dir or not self.fetch_done:
+            return
 
-    async def run(self):
-        # read from database
+        now = aktime.get_msec()
+        loop = asyncio.get_running_loop()
         for candle in self.candles.values():
-            await candle.fetch()
-
-        await self.conn.subscribe_stream(
-            self.market,
-            ApiCommand.PriceStream,
-            self.on_price_stream,
-            target=self.symbol_info.symbol
-        )
+            # encoding copies candles, so file is written in executor while ticks are applied
+            payload = candle.encode_snapshot(now)
+            await loop.run_in_executor(
+                None, candle_codec.write_file, candle.get_snapshot_path(snapshot_dir), payload)
+
+    async def run(self, scheduler: Optional[WarmupScheduler] = None):
+        # read from snapshot and database, each interval is fetched concurrently
+        await asyncio.gather(*[candle.fetch(scheduler, SNAPSHOT_DIR) for candle in self.candles.values()])
+        self.fetch_done = True
+        if self.ranking is not None:
+            self.update_ranking([TickTimeType.PreBid, TickTimeType.Normal, TickTimeType.MarketCloseBid])
+
+        if not self.subscribed:
+            self.subscribed = True
+            await self.conn.subscribe_stream(
+                self.market,
+                ApiCommand.PriceStream,
+                self.on_price_stream,
+                target=self.symbol_info.symbol
+            )
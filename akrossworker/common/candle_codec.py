@@ -0,0 +1,106 @@
+import base64
+import mmap
+import os
+import struct
+from typing import Union
+
+import numpy
+
+from akrossworker.common.args_constants import CandleFormat
+from akrossworker.common.candle_store import CandleStore, code_to_time_type, time_type_to_code
+
+
+# columnar candle payload (all little endian)
+# header: magic(4s) version(B) time type count(B) row count(I)
+# time types: length(B) + utf-8 bytes for each code used in columns
+# columns: open, high, low, close(f8) start, end(i8) base volume, quote volume(f8)
+#          time type code(u1) adjusted(u1), each column has row count items
+MAGIC = b'AKCD'
+VERSION = 1
+HEADER = struct.Struct('<4sBBI')
+_FLOAT_COLUMNS = ('opens', 'highs', 'lows', 'closes')
+_TIME_COLUMNS = ('start_times', 'end_times')
+_VOLUME_COLUMNS = ('base_volumes', 'quote_volumes')
+
+
+def encode(store: CandleStore) -> bytes:
+    codes = store.time_type_codes
+    used = numpy.unique(codes)
+    # codes are written as index of time type table in payload
+    local_codes = numpy.searchsorted(used, codes).astype('<u1')
+
+    chunks = [HEADER.pack(MAGIC, VERSION, len(used), len(store))]
+    for code in used.tolist():
+        name = code_to_time_type(code).encode()
+        chunks.append(struct.pack('<B', len(name)) + name)
+    for column in _FLOAT_COLUMNS:
+        chunks.append(getattr(store, column).astype('<f8').tobytes())
+    for column in _TIME_COLUMNS:
+        chunks.append(getattr(store, column).astype('<i8').tobytes())
+    for column in _VOLUME_COLUMNS:
+        chunks.append(getattr(store, column).astype('<f8').tobytes())
+    chunks.append(local_codes.tobytes())
+    chunks.append(store.adjusted_flags.astype('<u1').tobytes())
+    return b''.join(chunks)
+
+
+def decode(payload: bytes) -> CandleStore:
+    magic, version, type_count, count = HEADER.unpack_from(payload, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('not a columnar candle payload')
+
+    offset = HEADER.size
+    table = []
+    for _ in range(type_count):
+        length = payload[offset]
+        table.append(time_type_to_code(payload[offset + 1:offset + 1 + length].decode()))
+        offset += 1 + length
+
+    def read(dtype: str):
+        nonlocal offset
+        column = numpy.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+        offset += column.nbytes
+        return column
+
+    prices = [read('<f8') for _ in _FLOAT_COLUMNS]
+    times = [read('<i8') for _ in _TIME_COLUMNS]
+    volumes = [read('<f8') for _ in _VOLUME_COLUMNS]
+    local_codes = read('<u1')
+    adjusted = read('<u1')
+    return CandleStore.CreateFromColumns(
+        *prices, *times, *volumes,
+        numpy.array(table, dtype=numpy.int8)[local_codes],
+        adjusted.astype(numpy.bool_)
+    )
+
+
+def to_response(store: CandleStore) -> dict:
+    return {
+        'format': CandleFormat.Columnar,
+        'data': base64.b64encode(encode(store)).decode('ascii')
+    }
+
+
+def from_response(response: Union[dict, str]) -> CandleStore:
+    data = response['data'] if isinstance(response, dict) else response
+    return decode(base64.b64decode(data))
+
+
+def write_file(path: str, payload: bytes) -> None:
+    # write to temporary file and replace, reader never sees a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(temp_path, path)
+
+
+def read_file(path: str) -> CandleStore:
+    """
+    columns are read from memory mapped file and copied into a new store once
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise ValueError('not a columnar candle payload')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as payload:
+            return decode(payload)
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import sys
+
+from pymongo import ReplaceOne
+
+from akrossworker.common.db import DBEnum, Database
+from akrossworker.common.protocol import CANDLE_SCHEMA_VERSION, PriceCandleProtocol
+
+
+LOGGER = logging.getLogger(__name__)
+# progress of each collection is kept in this collection of the same database
+PROGRESS_COLLECTION = 'candle_migration'
+BATCH_SIZE = 5000
+# candle prices of KRX are stored as integer
+INTEGER_PRICE_DBS = [DBEnum.KRX_QUOTE_DB]
+
+
+class CandleMigration:
+    """
+    rewrite candle documents of a quote database to CANDLE_SCHEMA_VERSION in _id order.
+    readers parse both versions, so migration can run while caches are serving.
+    last migrated _id is saved after each batch and next run resumes from there
+    """
+    def __init__(self, db: Database, db_name: str, batch_size: int = BATCH_SIZE, pause: float = 0):
+        self.db = db
+        self.db_name = db_name
+        self.batch_size = batch_size
+        self.pause = pause
+        self.integer_price = db_name in INTEGER_PRICE_DBS
+
+    async def get_candle_collections(self) -> list:
+        names = await self.db.client[self.db_name].list_collection_names()
+        return sorted(name for name in names if name != PROGRESS_COLLECTION and '_1' in name)
+
+    async def migrate_collection(self, collection_name: str) -> int:
+        database = self.db.client[self.db_name]
+        progress = await database[PROGRESS_COLLECTION].find_one({'collection': collection_name})
+        if progress is not None and progress['version'] >= CANDLE_SCHEMA_VERSION:
+            return 0
+
+        query = {'v': {'$not': {'$gte': CANDLE_SCHEMA_VERSION}}}
+        if progress is not None and progress.get('lastId') is not None:
+            query['_id'] = {'$gt': progress['lastId']}
+
+        migrated = 0
+        while True:
+            cursor = database[collection_name].find(query).sort('_id', 1).limit(self.batch_size)
+            rows = await cursor.to_list(None)
+            if len(rows) == 0:
+                break
+
+            requests = []
+            for row in rows:
+                doc = PriceCandleProtocol.ParseDatabase(row).to_database(
+                    integer_price=self.integer_price)
+                doc['_id'] = row['_id']
+                requests.append(ReplaceOne({'_id': row['_id']}, doc))
+            await database[collection_name].bulk_write(requests, ordered=False)
+
+            migrated += len(rows)
+            query['_id'] = {'$gt': rows[-1]['_id']}
+            await database[PROGRESS_COLLECTION].update_one(
+                {'collection': collection_name},
+                {'$set': {'lastId': rows[-1]['_id'], 'version': 1}}, upsert=True)
+            if self.pause > 0:
+                await asyncio.sleep(self.pause)
+
+        await database[PROGRESS_COLLECTION].update_one(
+            {'collection': collection_name},
+            {'$set': {'version': CANDLE_SCHEMA_VERSION}}, upsert=True)
+        return migrated
+
+    async def run(self, collection_names: list = []) -> None:
+        if not await self.db.connected():
+            LOGGER.error('mongodb is not connected')
+            return
+
+        if len(collection_names) == 0:
+            collection_names = await self.get_candle_collections()
+        for progress, collection_name in enumerate(collection_names):
+            migrated = await self.migrate_collection(collection_name)
+            LOGGER.warning('migrated %s.%s(%d/%d): %d documents',
+                           self.db_name, collection_name,
+                           progress + 1, len(collection_names), migrated)
+
+
+async def main() -> None:
+    # python -m akrossworker.common.candle_migration krx_quote [collection ...]
+    db_names = [DBEnum.KRX_QUOTE_DB, DBEnum.BINANCE_QUOTE_DB]
+    if len(sys.argv) > 1:
+        db_names = [sys.argv[1]]
+    db = Database()
+    for db_name in db_names:
+        await CandleMigration(db, db_name).run(sys.argv[2:])
+
+
+if __name__ == '__main__':
+    LOG_FORMAT = ('%(levelname) -10s %(asctime)s %(name) -30s %(funcName) '
+                  '-35s %(lineno) -5d: %(message)s')
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    asyncio.run(main())
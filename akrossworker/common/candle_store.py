@@ -0,0 +1,670 @@
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import bson
+import numpy
+
+from akrossworker.common.args_constants import TickTimeType
+from akrossworker.common.protocol import PriceCandleProtocol
+
+
+TIME_TYPES: List[str] = [
+    TickTimeType.Normal,
+    TickTimeType.PreCloseBid,
+    TickTimeType.PreClose,
+    TickTimeType.PreBid,
+    TickTimeType.TradingBid,
+    TickTimeType.MarketCloseBid,
+    TickTimeType.ExtendedCloseBid,
+    TickTimeType.ExtendedClose,
+    TickTimeType.ExtendedTradingBid,
+    TickTimeType.ExtendedTrading,
+    TickTimeType.Unknown
+]
+_TIME_TYPE_CODES: Dict[str, int] = {
+    time_type: code for code, time_type in enumerate(TIME_TYPES)}
+
+
+def time_type_to_code(time_type: str) -> int:
+    # time type not listed in TickTimeType get a new code at runtime
+    if time_type not in _TIME_TYPE_CODES:
+        _TIME_TYPE_CODES[time_type] = len(TIME_TYPES)
+        TIME_TYPES.append(time_type)
+    return _TIME_TYPE_CODES[time_type]
+
+
+def code_to_time_type(code: int) -> str:
+    return TIME_TYPES[code]
+
+
+# fields of candle document used by CandleStore, see PriceCandleProtocol.to_database
+DATABASE_PROJECTION = {
+    '_id': False, 'v': True, 'startTime': True, 'endTime': True, 'timeType': True,
+    'arr': True, 'open': True, 'high': True, 'low': True, 'close': True,
+    'baseVolume': True, 'quoteVolume': True, 'adjusted': True}
+
+
+def _database_values(row: dict) -> list:
+    if row.get('v', 1) >= 2:
+        return [row['open'], row['high'], row['low'], row['close'],
+                row['baseVolume'], row['quoteVolume'], row['adjusted']]
+    return row['arr']
+
+
+def database_columns(rows: List[dict]) -> List[numpy.ndarray]:
+    """
+    same as PriceCandleProtocol.ParseDatabase for all rows at once,
+    values of both schema versions are converted to float by numpy instead of one by one
+    """
+    count = len(rows)
+    values = numpy.array([_database_values(row) for row in rows], dtype=object).reshape(count, 7)
+    prices = values[:, :6].astype(numpy.float64)
+    adjusted = values[:, 6]
+    time_types = [row['timeType'] for row in rows]
+    for time_type in set(time_types):
+        time_type_to_code(time_type)
+    return [
+        prices[:, 0], prices[:, 1], prices[:, 2], prices[:, 3],
+        numpy.array([row['startTime'] for row in rows], dtype=numpy.int64),
+        numpy.array([row['endTime'] for row in rows], dtype=numpy.int64),
+        prices[:, 4], prices[:, 5],
+        numpy.fromiter(map(_TIME_TYPE_CODES.__getitem__, time_types), numpy.int8, count),
+        (adjusted == '1') | (adjusted == True)  # noqa: E712
+    ]
+
+
+_INT32 = struct.Struct('<i')
+# bson element types of candle document v2, value size and dtype
+_BSON_STRING = 0x02
+_BSON_VALUES = {
+    0x01: (8, '<f8'),  # double
+    0x08: (1, 'u1'),   # boolean
+    0x10: (4, '<i4'),  # int32
+    0x12: (8, '<i8')   # int64
+}
+_RAW_FIELDS = ('v', 'startTime', 'endTime', 'timeType', 'open', 'high', 'low', 'close',
+               'baseVolume', 'quoteVolume', 'adjusted')
+
+
+def _document_layout(batch: bytes) -> Optional[Dict[str, tuple]]:
+    """
+    {name: (bson type, value offset)} of the first document, None for unsupported type
+    """
+    end = _INT32.unpack_from(batch, 0)[0] - 1
+    pos = 4
+    layout = {}
+    while pos < end:
+        element_type = batch[pos]
+        name_end = batch.index(b'\0', pos + 1)
+        name = batch[pos + 1:name_end].decode()
+        pos = name_end + 1
+        layout[name] = (element_type, pos)
+        if element_type == _BSON_STRING:
+            pos += 4 + _INT32.unpack_from(batch, pos)[0]
+        elif element_type in _BSON_VALUES:
+            pos += _BSON_VALUES[element_type][0]
+        else:
+            return None
+    return layout
+
+
+def raw_database_columns(batch: bytes) -> Optional[List[numpy.ndarray]]:
+    """
+    same as database_columns(bson.decode_all(batch)) without building documents.
+    every document of schema v2 in a batch has the layout of the first one except length of
+    timeType, so values are gathered from raw bytes by numpy. None when layout differs
+    (schema v1, other field order or value type) and batch should be decoded to documents
+    """
+    offsets = []
+    append, unpack_from = offsets.append, _INT32.unpack_from
+    pos, total = 0, len(batch)
+    while pos < total:
+        append(pos)
+        pos += unpack_from(batch, pos)[0]
+    if len(offsets) == 0 or pos != total:
+        return None
+    layout = _document_layout(batch)
+    if (layout is None or len(layout) != len(_RAW_FIELDS) or
+            any(name not in layout for name in _RAW_FIELDS) or
+            layout['timeType'][0] != _BSON_STRING or
+            any(layout[name][0] == _BSON_STRING for name in _RAW_FIELDS if name != 'timeType')):
+        return None
+
+    data = numpy.frombuffer(batch, dtype=numpy.uint8)
+    starts = numpy.array(offsets, dtype=numpy.int64)
+    string_offset = layout['timeType'][1]
+
+    def gather(positions: numpy.ndarray, indexes: List[int]) -> numpy.ndarray:
+        return data[positions[:, None] + numpy.array(indexes, dtype=numpy.int64)]
+
+    string_sizes = gather(starts + string_offset, list(range(4))).view('<i4').ravel().astype(numpy.int64)
+    shift = string_sizes - string_sizes[0]
+    lengths = numpy.diff(numpy.append(starts, len(batch)))
+    if not numpy.array_equal(lengths, lengths[0] + shift):
+        return None
+
+    # bytes of elements before and after timeType are gathered at once for every document,
+    # type and name of each element should be same as the first document
+    parts = {True: ([], [], []), False: ([], [], [])}
+    for name, (element_type, offset) in layout.items():
+        if element_type == _BSON_STRING:
+            continue
+        indexes, expected, values = parts[offset < string_offset]
+        header = bytes([element_type]) + name.encode() + b'\0'
+        indexes.extend(range(offset - len(header), offset))
+        expected.extend(header)
+        size, dtype = _BSON_VALUES[element_type]
+        values.append((name, len(indexes), size, dtype))
+        indexes.extend(range(offset, offset + size))
+
+    columns = {}
+    for before, (indexes, expected, values) in parts.items():
+        matrix = gather(starts if before else starts + shift, indexes)
+        header_columns = [i for i in range(len(indexes)) if i not in {
+            start + j for _, start, size, _ in values for j in range(size)}]
+        if not (matrix[:, header_columns] == numpy.array(expected, dtype=numpy.uint8)).all():
+            return None
+        for name, start, size, dtype in values:
+            columns[name] = numpy.ascontiguousarray(matrix[:, start:start + size]).view(dtype).ravel()
+    if not (columns['v'] >= 2).all():
+        return None
+
+    # time types are few and short, rows of name bytes are compared as an integer
+    max_size = int(string_sizes.max()) - 1
+    if max_size > 8:
+        return None
+    names = numpy.zeros((len(offsets), 8), dtype=numpy.uint8)
+    names[:, :max_size] = gather(starts + string_offset + 4, list(range(max_size)))
+    names[numpy.arange(8) >= (string_sizes[:, None] - 1)] = 0
+    distinct, inverse = numpy.unique(names.view('<u8').ravel(), return_inverse=True)
+    codes = numpy.array(
+        [time_type_to_code(int(key).to_bytes(8, 'little').rstrip(b'\0').decode()) for key in distinct],
+        dtype=numpy.int8)
+    return [
+        columns['open'].astype(numpy.float64), columns['high'].astype(numpy.float64),
+        columns['low'].astype(numpy.float64), columns['close'].astype(numpy.float64),
+        columns['startTime'].astype(numpy.int64), columns['endTime'].astype(numpy.int64),
+        columns['baseVolume'].astype(numpy.float64), columns['quoteVolume'].astype(numpy.float64),
+        codes[inverse],
+        columns['adjusted'] != 0
+    ]
+
+
+class CandleStore:
+    """
+    columnar candle storage, each field of PriceCandleProtocol is kept in
+    a preallocated typed array and candle object is created only when a row is read.
+    limit_count 0 means unlimited, otherwise oldest rows are trimmed when appending.
+    slicing returns a store sharing arrays with this one, use it as read only.
+    snapshot returns a read only copy which can be shared between readers
+
+    rows are placed in [head, head + size) of arrays, trimming oldest rows only moves head.
+    when tail reaches end of arrays, rows are moved back to the front once,
+    limited store reserves limit_count / 4 spare rows so that happens
+    every limit_count / 4 appends and rows are always contiguous
+    """
+    INITIAL_CAPACITY = 256
+
+    def __init__(self, limit_count: int = 0, capacity: int = 0):
+        self.limit_count = limit_count
+        self._head = 0
+        self._size = 0
+        if capacity <= 0:
+            capacity = self.INITIAL_CAPACITY
+        if limit_count > 0:
+            capacity = min(capacity, self._max_capacity())
+        self._allocate(capacity)
+
+    def _max_capacity(self) -> int:
+        return self.limit_count + max(self.limit_count // 4, 1)
+
+    def _allocate(self, capacity: int) -> None:
+        self._open = numpy.zeros(capacity, dtype=numpy.float64)
+        self._high = numpy.zeros(capacity, dtype=numpy.float64)
+        self._low = numpy.zeros(capacity, dtype=numpy.float64)
+        self._close = numpy.zeros(capacity, dtype=numpy.float64)
+        self._start = numpy.zeros(capacity, dtype=numpy.int64)
+        self._end = numpy.zeros(capacity, dtype=numpy.int64)
+        self._base_volume = numpy.zeros(capacity, dtype=numpy.float64)
+        self._quote_volume = numpy.zeros(capacity, dtype=numpy.float64)
+        self._time_type = numpy.zeros(capacity, dtype=numpy.int8)
+        self._adjusted = numpy.zeros(capacity, dtype=numpy.bool_)
+
+    def _arrays(self) -> List[numpy.ndarray]:
+        return [self._open, self._high, self._low, self._close,
+                self._start, self._end, self._base_volume, self._quote_volume,
+                self._time_type, self._adjusted]
+
+    def _set_arrays(self, arrays: List[numpy.ndarray]) -> None:
+        (self._open, self._high, self._low, self._close,
+         self._start, self._end, self._base_volume, self._quote_volume,
+         self._time_type, self._adjusted) = arrays
+
+    def _reserve(self, count: int) -> None:
+        """
+        make room for count rows after the last row
+        """
+        self._check_writable()
+        capacity = len(self._start)
+        needed = self._size + count
+        if self._head + needed <= capacity:
+            return
+
+        head, tail = self._head, self._head + self._size
+        at_max = self.limit_count > 0 and capacity >= self._max_capacity()
+        if needed <= capacity and (at_max or head >= capacity // 4):
+            for arr in self._arrays():
+                arr[:self._size] = arr[head:tail]
+        else:
+            new_capacity = max(capacity * 2, needed)
+            if self.limit_count > 0:
+                new_capacity = max(min(new_capacity, self._max_capacity()), needed)
+            arrays = []
+            for arr in self._arrays():
+                grown = numpy.zeros(new_capacity, dtype=arr.dtype)
+                grown[:self._size] = arr[head:tail]
+                arrays.append(grown)
+            self._set_arrays(arrays)
+        self._head = 0
+
+    @property
+    def read_only(self) -> bool:
+        return not self._start.flags.writeable
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ValueError('candle store is read only')
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[PriceCandleProtocol]:
+        for i in range(self._head, self._head + self._size):
+            yield self._row(i)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[PriceCandleProtocol, 'CandleStore']:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._size)
+            if step != 1:
+                raise ValueError('step is not supported')
+            return self._view(start, max(start, stop))
+
+        if index < 0:
+            index += self._size
+        if index < 0 or index >= self._size:
+            raise IndexError('candle index out of range')
+        return self._row(self._head + index)
+
+    def _row(self, i: int) -> PriceCandleProtocol:
+        return PriceCandleProtocol(
+            self._open[i].item(),
+            self._high[i].item(),
+            self._low[i].item(),
+            self._close[i].item(),
+            self._start[i].item(),
+            self._end[i].item(),
+            self._base_volume[i].item(),
+            self._quote_volume[i].item(),
+            TIME_TYPES[self._time_type[i]],
+            bool(self._adjusted[i])
+        )
+
+    def _view(self, start: int, stop: int) -> 'CandleStore':
+        view = CandleStore.__new__(CandleStore)
+        view.limit_count = 0
+        view._head = 0
+        view._size = stop - start
+        start += self._head
+        stop += self._head
+        view._set_arrays([arr[start:stop] for arr in self._arrays()])
+        return view
+
+    def _rows(self, arr: numpy.ndarray) -> numpy.ndarray:
+        return arr[self._head:self._head + self._size]
+
+    @property
+    def opens(self) -> numpy.ndarray:
+        return self._rows(self._open)
+
+    @property
+    def highs(self) -> numpy.ndarray:
+        return self._rows(self._high)
+
+    @property
+    def lows(self) -> numpy.ndarray:
+        return self._rows(self._low)
+
+    @property
+    def closes(self) -> numpy.ndarray:
+        return self._rows(self._close)
+
+    @property
+    def start_times(self) -> numpy.ndarray:
+        return self._rows(self._start)
+
+    @property
+    def end_times(self) -> numpy.ndarray:
+        return self._rows(self._end)
+
+    @property
+    def base_volumes(self) -> numpy.ndarray:
+        return self._rows(self._base_volume)
+
+    @property
+    def quote_volumes(self) -> numpy.ndarray:
+        return self._rows(self._quote_volume)
+
+    @property
+    def time_type_codes(self) -> numpy.ndarray:
+        return self._rows(self._time_type)
+
+    @property
+    def adjusted_flags(self) -> numpy.ndarray:
+        return self._rows(self._adjusted)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(arr.nbytes for arr in self._arrays())
+
+    def _position(self, index: int) -> int:
+        return self._head + index % self._size
+
+    def start_time_at(self, index: int) -> int:
+        return self._start[self._position(index)].item()
+
+    def end_time_at(self, index: int) -> int:
+        return self._end[self._position(index)].item()
+
+    def time_type_at(self, index: int) -> str:
+        return TIME_TYPES[self._time_type[self._position(index)]]
+
+    def price_close_at(self, index: int) -> float:
+        return self._close[self._position(index)].item()
+
+    def append(
+        self,
+        price_open: float,
+        price_high: float,
+        price_low: float,
+        price_close: float,
+        start_time: int,
+        end_time: int,
+        base_asset_volume: float,
+        quote_asset_volume: float,
+        time_type: str = TickTimeType.Normal,
+        adjusted: bool = False
+    ) -> None:
+        if self.limit_count > 0 and self._size >= self.limit_count:
+            self.trim(self.limit_count - 1)
+        self._reserve(1)
+        i = self._head + self._size
+        self._open[i] = price_open
+        self._high[i] = price_high
+        self._low[i] = price_low
+        self._close[i] = price_close
+        self._start[i] = start_time
+        self._end[i] = end_time
+        self._base_volume[i] = base_asset_volume
+        self._quote_volume[i] = quote_asset_volume
+        self._time_type[i] = time_type_to_code(time_type)
+        self._adjusted[i] = adjusted
+        self._size += 1
+
+    def append_candle(self, candle: PriceCandleProtocol) -> None:
+        self.append(
+            candle.price_open, candle.price_high, candle.price_low, candle.price_close,
+            candle.start_time, candle.end_time,
+            candle.base_asset_volume, candle.quote_asset_volume,
+            candle.time_type, candle.adjusted
+        )
+
+    def extend_candles(self, candles: Iterable[PriceCandleProtocol]) -> None:
+        candles = list(candles)
+        if len(candles) == 0:
+            return
+        columns = [[] for _ in range(10)]
+        for candle in candles:
+            columns[0].append(candle.price_open)
+            columns[1].append(candle.price_high)
+            columns[2].append(candle.price_low)
+            columns[3].append(candle.price_close)
+            columns[4].append(candle.start_time)
+            columns[5].append(candle.end_time)
+            columns[6].append(candle.base_asset_volume)
+            columns[7].append(candle.quote_asset_volume)
+            columns[8].append(time_type_to_code(candle.time_type))
+            columns[9].append(candle.adjusted)
+        self._extend_columns(columns)
+
+    def extend_database(self, rows: List[dict], end_before: int = 0) -> None:
+        """
+        append candle documents of database,
+        when end_before is set, only candles ending before it are appended
+        """
+        if len(rows) == 0:
+            return
+        self._extend_database_columns(database_columns(rows), end_before)
+
+    def extend_database_batch(self, batch: bytes, end_before: int = 0) -> None:
+        """
+        same as extend_database with raw bson batch of candle documents
+        """
+        columns = raw_database_columns(batch)
+        if columns is None:
+            self.extend_database(bson.decode_all(batch), end_before)
+        else:
+            self._extend_database_columns(columns, end_before)
+
+    def _extend_database_columns(self, columns: List[numpy.ndarray], end_before: int) -> None:
+        if end_before:
+            ended = columns[5] < end_before
+            columns = [column[ended] for column in columns]
+        self._extend_columns(columns)
+
+    def extend_store(self, store: 'CandleStore') -> None:
+        self._extend_columns([store._rows(arr) for arr in store._arrays()])
+
+    def _extend_columns(self, columns: list) -> None:
+        count = len(columns[4])
+        if count == 0:
+            return
+        if self.limit_count > 0 and count > self.limit_count:
+            columns = [column[-self.limit_count:] for column in columns]
+            count = self.limit_count
+        if self.limit_count > 0 and self._size + count > self.limit_count:
+            self.trim(self.limit_count - count)
+        self._reserve(count)
+        tail = self._head + self._size
+        for arr, column in zip(self._arrays(), columns):
+            arr[tail:tail + count] = column
+        self._size += count
+
+    def update_last(self, price: float, volume: float, quote_volume: float) -> None:
+        """
+        apply one tick to the last candle
+        """
+        i = self._head + self._size - 1
+        self._close[i] = price
+        if price > self._high[i]:
+            self._high[i] = price
+        if price < self._low[i]:
+            self._low[i] = price
+        self._base_volume[i] += volume
+        self._quote_volume[i] += quote_volume
+
+    def update_last_batch(
+        self,
+        price: float,
+        high: float,
+        low: float,
+        volumes: List[float],
+        quote_volumes: List[float]
+    ) -> None:
+        """
+        apply ticks to the last candle at once, price is the last price and high, low of ticks.
+        volumes are added in order so sums are same as update_last of each tick
+        """
+        i = self._head + self._size - 1
+        self._close[i] = price
+        if high > self._high[i]:
+            self._high[i] = high
+        if low < self._low[i]:
+            self._low[i] = low
+        base_volume = float(self._base_volume[i])
+        for volume in volumes:
+            base_volume += volume
+        self._base_volume[i] = base_volume
+        quote_volume = float(self._quote_volume[i])
+        for volume in quote_volumes:
+            quote_volume += volume
+        self._quote_volume[i] = quote_volume
+
+    def merge_last(self, candle: PriceCandleProtocol) -> None:
+        """
+        merge smaller unit candle into the last candle
+        """
+        i = self._head + self._size - 1
+        self._close[i] = candle.price_close
+        if candle.price_high > self._high[i]:
+            self._high[i] = candle.price_high
+        if candle.price_low < self._low[i]:
+            self._low[i] = candle.price_low
+        self._base_volume[i] += candle.base_asset_volume
+        self._quote_volume[i] += candle.quote_asset_volume
+
+    def join_last(self, store: 'CandleStore', index: int) -> None:
+        """
+        extend the last candle with a following candle of other store
+        """
+        index = store._position(index)
+        i = self._head + self._size - 1
+        self._close[i] = store._close[index]
+        self._end[i] = store._end[index]
+        if store._high[index] > self._high[i]:
+            self._high[i] = store._high[index]
+        if store._low[index] < self._low[i]:
+            self._low[i] = store._low[index]
+        self._base_volume[i] += store._base_volume[index]
+        self._quote_volume[i] += store._quote_volume[index]
+
+    def append_row(self, store: 'CandleStore', index: int, start_time: int) -> None:
+        """
+        copy a row of other store with given start time
+        """
+        index = store._position(index)
+        self.append(
+            store._open[index], store._high[index], store._low[index], store._close[index],
+            start_time, store._end[index],
+            store._base_volume[index], store._quote_volume[index],
+            TIME_TYPES[store._time_type[index]], store._adjusted[index]
+        )
+
+    def reduce_first(self, store: 'CandleStore', count: int, start_time: int) -> None:
+        """
+        replace the first row with first count rows of other store reduced to one candle
+        """
+        self._check_writable()
+        first = store._position(0)
+        last = first + count
+        i = self._head
+        self._open[i] = store._open[first]
+        self._high[i] = store._high[first:last].max()
+        self._low[i] = store._low[first:last].min()
+        self._close[i] = store._close[last - 1]
+        self._start[i] = start_time
+        self._end[i] = store._end[last - 1]
+        self._base_volume[i] = store._base_volume[first:last].sum()
+        self._quote_volume[i] = store._quote_volume[first:last].sum()
+        self._time_type[i] = store._time_type[first]
+        self._adjusted[i] = store._adjusted[first]
+
+    def trim(self, count: int) -> None:
+        """
+        keep latest count rows only
+        """
+        self._check_writable()
+        count = max(count, 0)
+        if self._size <= count:
+            return
+        self._head += self._size - count
+        self._size = count
+
+    def clear(self) -> None:
+        self._check_writable()
+        self._head = 0
+        self._size = 0
+
+    def snapshot(self) -> 'CandleStore':
+        """
+        read only copy of current rows, later writes to this store do not change it
+        """
+        snapshot = CandleStore.__new__(CandleStore)
+        snapshot.limit_count = 0
+        snapshot._head = 0
+        snapshot._size = self._size
+        arrays = []
+        for arr in self._arrays():
+            copied = self._rows(arr).copy()
+            copied.flags.writeable = False
+            arrays.append(copied)
+        snapshot._set_arrays(arrays)
+        return snapshot
+
+    def to_candles(self) -> List[PriceCandleProtocol]:
+        return list(self)
+
+    def to_network(self) -> list:
+        time_types = TIME_TYPES
+        return [
+            [str(o), str(h), str(lo), str(c), s, e, str(bv), str(qv),
+             time_types[tt], '1' if adj else '0']
+            for o, h, lo, c, s, e, bv, qv, tt, adj in zip(
+                self.opens.tolist(), self.highs.tolist(),
+                self.lows.tolist(), self.closes.tolist(),
+                self.start_times.tolist(), self.end_times.tolist(),
+                self.base_volumes.tolist(), self.quote_volumes.tolist(),
+                self.time_type_codes.tolist(), self.adjusted_flags.tolist())
+        ]
+
+    @classmethod
+    def CreateFromCandles(
+        cls,
+        candles: Iterable[PriceCandleProtocol],
+        limit_count: int = 0
+    ) -> 'CandleStore':
+        store = CandleStore(limit_count)
+        store.extend_candles(candles)
+        return store
+
+    @classmethod
+    def CreateFromDatabase(
+        cls,
+        rows: List[dict],
+        limit_count: int = 0
+    ) -> 'CandleStore':
+        store = CandleStore(limit_count, len(rows))
+        store.extend_database(rows)
+        return store
+
+    @classmethod
+    def CreateFromColumns(
+        cls,
+        price_open: numpy.ndarray,
+        price_high: numpy.ndarray,
+        price_low: numpy.ndarray,
+        price_close: numpy.ndarray,
+        start_time: numpy.ndarray,
+        end_time: numpy.ndarray,
+        base_asset_volume: numpy.ndarray,
+        quote_asset_volume: numpy.ndarray,
+        time_type_code: numpy.ndarray,
+        adjusted: numpy.ndarray,
+        limit_count: int = 0
+    ) -> 'CandleStore':
+        store = CandleStore(limit_count, len(start_time))
+        store._extend_columns([
+            price_open, price_high, price_low, price_close,
+            start_time, end_time, base_asset_volume, quote_asset_volume,
+            time_type_code, adjusted
+        ])
+        return store
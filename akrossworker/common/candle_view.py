@@ -0,0 +1,143 @@
+import itertools
+import time
+from collections import deque
+
+import numpy
+
+from akrossworker.common import grouping
+from akrossworker.common.candle_store import CandleStore
+
+
+# unique in a process and across restarts, page cursor of an old rebuild is rejected
+_GENERATIONS = itertools.count(time.time_ns())
+
+class CandleView:
+    """
+    aggregated candles of source store kept up to date with source changes.
+    new source candle extends or opens an aggregated candle and tick on source's
+    last candle is applied to the last aggregated candle as it is.
+    when oldest source candle is trimmed, it is removed from the first aggregated candle
+    of intraday view, other views are rebuilt on next request
+    """
+    def __init__(self, source: CandleStore, interval_type: str, interval: int):
+        self.source = source
+        self.interval_type = interval_type
+        self.interval = interval
+        self.data = CandleStore()
+        # number of source candles in each aggregated candle
+        self.group_sizes = deque()
+        # rows are numbered from the first row of last rebuild, removed first rows keep the numbers
+        self.generation = 0
+        self.first_row = 0
+        self.dirty = True
+        self._network = []
+        self._network_valid = 0
+        self._snapshot = None
+
+    def invalidate(self) -> None:
+        self.dirty = True
+        self._snapshot = None
+
+    def _rebuild(self) -> None:
+        self.data = grouping.aggregate(self.source, self.interval_type, self.interval)
+        self.group_sizes = deque()
+        if len(self.data) > 0:
+            firsts = grouping.group_firsts(self.source, self.interval_type, self.interval)
+            self.group_sizes.extend(numpy.diff(numpy.append(firsts, len(self.source))).tolist())
+        self._network = []
+        self._network_valid = 0
+        self.generation = next(_GENERATIONS)
+        self.first_row = 0
+        self.dirty = False
+
+    def on_source_appended(self) -> None:
+        if self.dirty:
+            return
+
+        self._snapshot = None
+        index = len(self.source) - 1
+        grouped_count = self.group_sizes[-1] if len(self.group_sizes) > 0 else 0
+        if grouping.is_group_break(
+                self.source, index, self.interval_type, self.interval, grouped_count):
+            start_time = grouping.get_group_start(
+                self.source.start_time_at(index), self.interval_type, self.interval)
+            self.data.append_row(self.source, index, start_time)
+            self.group_sizes.append(1)
+        else:
+            self.data.join_last(self.source, index)
+            self.group_sizes[-1] += 1
+            self._network_valid = min(self._network_valid, len(self.data) - 1)
+
+    def on_source_trimmed(self) -> None:
+        """
+        called after the oldest source candle is removed, before new candle is notified.
+        intraday groups are aligned to time, so the first aggregated candle shrinks or is removed.
+        groups of other types are counted from the first source candle and every group moves,
+        also when first group is split by count in same time slot
+        """
+        if self.dirty:
+            return
+        elif (not grouping.is_intraday(self.interval_type) or len(self.data) == 0 or
+                (len(self.data) > 1 and
+                 self.data.start_time_at(0) == self.data.start_time_at(1) and
+                 self.data.time_type_codes[0] == self.data.time_type_codes[1])):
+            self.invalidate()
+            return
+
+        self._snapshot = None
+        self.group_sizes[0] -= 1
+        if self.group_sizes[0] == 0:
+            self.group_sizes.popleft()
+            if len(self.group_sizes) == 0:
+                self.invalidate()
+                return
+            self.data.trim(len(self.data) - 1)
+            self.first_row += 1
+            if self._network_valid > 0:
+                del self._network[0]
+                self._network_valid -= 1
+        else:
+            self.data.reduce_first(self.source, self.group_sizes[0], self.data.start_time_at(0))
+            if self._network_valid > 0:
+                self._network[0] = self.data[0:1].to_network()[0]
+
+    def on_source_updated(self, price: float, volume: float, quote_volume: float) -> None:
+        if self.dirty or len(self.data) == 0:
+            return
+        self._snapshot = None
+        self.data.update_last(price, volume, quote_volume)
+        self._network_valid = min(self._network_valid, len(self.data) - 1)
+
+    def on_source_batch_updated(
+        self,
+        price: float,
+        high: float,
+        low: float,
+        volumes: list,
+        quote_volumes: list
+    ) -> None:
+        if self.dirty or len(self.data) == 0:
+            return
+        self._snapshot = None
+        self.data.update_last_batch(price, high, low, volumes, quote_volumes)
+        self._network_valid = min(self._network_valid, len(self.data) - 1)
+
+    def get_store(self) -> CandleStore:
+        if self.dirty:
+            self._rebuild()
+        return self.data
+
+    def get_snapshot(self) -> CandleStore:
+        """
+        read only copy of aggregated candles, same copy is returned until view is changed
+        """
+        if self._snapshot is None:
+            self._snapshot = self.get_store().snapshot()
+        return self._snapshot
+
+    def get_network(self) -> list:
+        data = self.get_store()
+        del self._network[self._network_valid:]
+        self._network.extend(data[self._network_valid:].to_network())
+        self._network_valid = len(self._network)
+        return list(self._network)
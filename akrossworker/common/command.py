@@ -22,6 +22,7 @@ class ApiCommand:
     DailyCredit = 'dailyCredit'
     DailyShortSell = 'dailyShortSell'
     DailyBroker = 'dailyBroker'
+    CacheStat = 'cacheStat'
 
 
 class AccountApiCommand:
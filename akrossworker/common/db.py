@@ -1,6 +1,7 @@
 from enum import Enum
-from typing import List
+from typing import AsyncIterator, List, Optional, Tuple
 from urllib.parse import quote_plus
+import bson
 import motor.motor_asyncio
 import pymongo
 import logging
@@ -64,7 +65,65 @@ class Database:
             return await cursor.to_list(None)
         return []
 
+    async def get_raw_batches(
+        self,
+        db_name: str,
+        collection_name: str,
+        query: dict = {},
+        projection: Optional[dict] = None,
+        batch_size: int = 0,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        limit: int = 0
+    ) -> AsyncIterator[bytes]:
+        """
+        raw bson of each server batch, documents are not decoded
+        """
+        if await self.connected():
+            db = self.client[db_name]
+            cursor = db[collection_name].find_raw_batches(
+                query, projection=projection or {'_id': False},
+                sort=sort, limit=limit, batch_size=batch_size)
+            async for batch in cursor:
+                yield batch
+
+    async def get_data_batches(
+        self,
+        db_name: str,
+        collection_name: str,
+        query: dict = {},
+        projection: Optional[dict] = None,
+        batch_size: int = 0,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        limit: int = 0
+    ) -> AsyncIterator[List[dict]]:
+        """
+        documents of each server batch, raw bson of a batch is decoded at once
+        so whole result is not kept in memory as documents
+        """
+        async for batch in self.get_raw_batches(
+                db_name, collection_name, query, projection, batch_size, sort, limit):
+            yield bson.decode_all(batch)
+
+    async def query(
+        self,
+        db_name: str,
+        collection_name: str,
+        query: dict = {},
+        projection: Optional[dict] = None,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        limit: int = 0,
+        batch_size: int = 0
+    ) -> AsyncIterator[dict]:
+        """
+        documents one by one, next batch is fetched from server when current one is consumed
+        """
+        async for batch in self.get_data_batches(
+                db_name, collection_name, query, projection, batch_size, sort, limit):
+            for document in batch:
+                yield document
+
     async def drop_collection(self, db_name: str, collection_name: str) -> None:
+        # use WatermarkCatalog.drop for candle collections, catalog entry is removed with it
         if await self.connected():
             db = self.client[db_name]
             await db[collection_name].drop()
@@ -86,6 +145,11 @@ class Database:
             db = self.client[db_name]
             await db[collection_name].update_one(query, {'$set': data}, upsert=True)
 
+    async def increase(self, db_name: str, collection_name: str, query: dict, data: dict) -> None:
+        if await self.connected():
+            db = self.client[db_name]
+            await db[collection_name].update_one(query, {'$inc': data}, upsert=True)
+
     async def insert_one(self, db_name: str, collection_name: str, data) -> None:
         if await self.connected():
             db = self.client[db_name]
@@ -97,35 +161,39 @@ class Database:
             await db[collection_name].insert_many(data)
 
     async def find_latest(self, db_name: str, collection_name: str, count: int):
+        # _id keeps insertion order like $natural and is always indexed
         if await self.connected():
             db = self.client[db_name]
-            cursor = db[collection_name].find().limit(count).sort([('$natural', -1)])
+            cursor = db[collection_name].find().limit(count).sort([('_id', -1)])
             return await cursor.to_list(None)
         return []
 
     async def find_first(self, db_name: str, collection_name: str, count: int):
         if await self.connected():
             db = self.client[db_name]
-            cursor = db[collection_name].find().limit(count).sort([('$natural', 1)])
+            cursor = db[collection_name].find().limit(count).sort([('_id', 1)])
             return await cursor.to_list(None)
         return []
 
-    async def get_price_stream_data(self, symbol: str, start_time: int, end_time: int):
-        return await self.get_data(
+    def iter_price_stream_data(self, symbol: str, start_time: int, end_time: int) -> AsyncIterator[dict]:
+        # _id keeps insertion order of ticks with same time
+        return self.query(
             'throwback',
             'p_' + symbol.lower(),
             {
                 'time': {'$gte': start_time, '$lte': end_time}
-            }
+            },
+            sort=[('time', 1), ('_id', 1)]
         )
-    
-    async def get_orderbook_stream_data(self, symbol: str, start_time: int, end_time: int):
-        return await self.get_data(
+
+    def iter_orderbook_stream_data(self, symbol: str, start_time: int, end_time: int) -> AsyncIterator[dict]:
+        return self.query(
             'throwback',
             'o_' + symbol.lower(),
             {
                 'time': {'$gte': start_time, '$lte': end_time}
-            }
+            },
+            sort=[('time', 1), ('_id', 1)]
         )
 
 
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import sys
+from typing import Dict, List, Tuple
+
+import pymongo
+
+from akrossworker.common.db import DBEnum, Database
+
+
+LOGGER = logging.getLogger(__name__)
+THROWBACK_DB = 'throwback'
+CONCURRENCY = int(os.getenv('AKROSS_INDEX_CONCURRENCY', '8'))
+# collections checked with explain() for each rule
+SAMPLE_COUNT = 20
+
+# (database, collection name pattern, ascending index keys, sample query and sort of hot path)
+INDEX_RULES: List[Tuple[str, str, List[List[str]], dict, List[Tuple[str, int]]]] = [
+    (DBEnum.KRX_QUOTE_DB, r'_1[mhdwM]$', [['startTime'], ['endTime']],
+     {'startTime': {'$gte': 0}}, []),
+    (DBEnum.BINANCE_QUOTE_DB, r'_1[mhdwM]$', [['startTime'], ['endTime']],
+     {'startTime': {'$gte': 0}}, []),
+    # stream iterators sort same time ticks by _id
+    (THROWBACK_DB, r'^[po]_', [['time', '_id']],
+     {'time': {'$gte': 0, '$lte': 0}}, [('time', 1), ('_id', 1)]),
+    (THROWBACK_DB, r'^r_', [['eventTime']], {'eventTime': {'$gte': 0, '$lte': 0}}, []),
+]
+
+
+def _has_stage(plan, stage: str) -> bool:
+    if isinstance(plan, dict):
+        if plan.get('stage') == stage:
+            return True
+        return any(_has_stage(value, stage) for value in plan.values())
+    elif isinstance(plan, list):
+        return any(_has_stage(value, stage) for value in plan)
+    return False
+
+
+class IndexBootstrapper:
+    """
+    create ascending indexes used by candle and stream queries on every matching
+    collection, existing indexes are kept so it can run any time.
+    check() explains sample query on some collections and returns ones doing COLLSCAN
+    or in memory SORT
+    """
+    def __init__(self, db: Database, concurrency: int = CONCURRENCY):
+        self.db = db
+        self.concurrency = concurrency
+
+    async def get_collections(self, db_name: str, pattern: str) -> List[str]:
+        names = await self.db.client[db_name].list_collection_names()
+        return sorted(name for name in names if re.search(pattern, name))
+
+    async def ensure_collection(self, db_name: str, collection_name: str, indexes: List[List[str]]) -> int:
+        collection = self.db.client[db_name][collection_name]
+        existing = await collection.index_information()
+        keys = [list(info['key']) for info in existing.values()]
+        created = 0
+        for fields in indexes:
+            key = [(field, pymongo.ASCENDING) for field in fields]
+            if key in keys:
+                continue
+            await collection.create_index(key)
+            created += 1
+        return created
+
+    async def _run_all(self, db_name: str, collection_names: List[str], work) -> list:
+        slot = asyncio.Semaphore(max(self.concurrency, 1))
+
+        async def run_one(collection_name):
+            async with slot:
+                try:
+                    return await work(collection_name)
+                except pymongo.errors.PyMongoError as e:
+                    LOGGER.error('%s.%s failed %s', db_name, collection_name, str(e))
+                    return None
+        return await asyncio.gather(*[run_one(name) for name in collection_names])
+
+    async def ensure(self) -> Dict[str, int]:
+        created = {}
+        for db_name, pattern, indexes, _, _ in INDEX_RULES:
+            collection_names = await self.get_collections(db_name, pattern)
+            results = await self._run_all(
+                db_name, collection_names,
+                lambda name: self.ensure_collection(db_name, name, indexes))
+            created[f'{db_name}/{pattern}'] = sum(result for result in results if result)
+            LOGGER.warning('%s %s: %d collections, %d indexes created',
+                           db_name, pattern, len(collection_names), created[f'{db_name}/{pattern}'])
+        return created
+
+    async def is_collscan(self, db_name: str, collection_name: str, query: dict, sort: list) -> bool:
+        cursor = self.db.client[db_name][collection_name].find(query)
+        if len(sort) > 0:
+            cursor = cursor.sort(sort)
+        plan = await cursor.explain()
+        plan = plan.get('queryPlanner', plan)
+        return _has_stage(plan, 'COLLSCAN') or _has_stage(plan, 'SORT')
+
+    async def check(self, sample_count: int = SAMPLE_COUNT) -> List[str]:
+        collscans = []
+        for db_name, pattern, _, query, sort in INDEX_RULES:
+            collection_names = await self.get_collections(db_name, pattern)
+            samples = random.sample(collection_names, min(sample_count, len(collection_names)))
+            results = await self._run_all(
+                db_name, samples, lambda name: self.is_collscan(db_name, name, query, sort))
+            for name, collscan in zip(samples, results):
+                if collscan:
+                    collscans.append(f'{db_name}.{name}')
+                    LOGGER.error('COLLSCAN or SORT on %s.%s with %s %s', db_name, name, query, sort)
+        return collscans
+
+
+async def main() -> None:
+    # python -m akrossworker.common.db_index [check]
+    db = Database()
+    if not await db.connected():
+        LOGGER.error('mongodb is not connected')
+        return
+
+    bootstrapper = IndexBootstrapper(db)
+    if len(sys.argv) < 2 or sys.argv[1] != 'check':
+        await bootstrapper.ensure()
+    collscans = await bootstrapper.check()
+    LOGGER.warning('%d sampled collections do COLLSCAN or SORT', len(collscans))
+
+
+if __name__ == '__main__':
+    LOG_FORMAT = ('%(levelname) -10s %(asctime)s %(name) -30s %(funcName) '
+                  '-35s %(lineno) -5d: %(message)s')
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    asyncio.run(main())
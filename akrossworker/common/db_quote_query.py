@@ -1,31 +1,28 @@
 from typing import List
 from akrossworker.common.db import DBEnum, Database
+from akrossworker.common.watermark import WatermarkCatalog
 
 
 class DBQuoteQuery:
     def __init__(self, quote_db_name, mongo_url: str = ''):
         self.db = Database(mongo_url)
         self.quote_db_name = quote_db_name
+        self.catalog = WatermarkCatalog(self.db, quote_db_name)
 
     async def find_first_ms(self, symbol: str, interval_type: str) -> int:
-        row = await self.db.find_first(
-            self.quote_db_name, symbol.lower() + '_1' + interval_type, 1)
-        if len(row) == 1:
-            return row[0]['startTime']
-        return -1
+        return await self.catalog.find_first_ms(symbol.lower() + '_1' + interval_type)
 
     async def insert_one(self, db_name: str, collection_name: str, data) -> None:
         await self.db.insert_one(db_name, collection_name, data)
     
     async def insert_many(self, db_name: str, collection_name: str, data: List[dict]) -> None:
-        await self.db.insert_many(db_name, collection_name, data)
+        if db_name == self.quote_db_name:
+            await self.catalog.insert_candles(collection_name, data)
+        else:
+            await self.db.insert_many(db_name, collection_name, data)
 
     async def find_latest_ms(self, symbol: str, interval_type: str) -> int:
-        row = await self.db.find_latest(
-            self.quote_db_name, symbol.lower() + '_1' + interval_type, 1)
-        if len(row) == 1:
-            return row[0]['endTime']
-        return -1
+        return await self.catalog.find_latest_ms(symbol.lower() + '_1' + interval_type)
     
     async def get_data(self, symbol: str, interval_type: str, start_time: int, end_time: int):
         return await self.db.get_data(
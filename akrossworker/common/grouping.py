@@ -1,70 +1,157 @@
-from typing import List
+from typing import List, Tuple, Union
+
+import numpy
 
 from akross.common import aktime
+from akrossworker.common.candle_store import CandleStore
 from akrossworker.common.protocol import PriceCandleProtocol
 
 
-def _can_grouping(
+def is_intraday(interval_type: str) -> bool:
+    return interval_type == 'm' or interval_type == 'h'
+
+
+def get_group_start(start_time: int, interval_type: str, interval: int) -> int:
+    if is_intraday(interval_type):
+        interval_len = aktime.interval_type_to_msec(interval_type) * interval
+        return start_time - (start_time % interval_len)
+    return start_time
+
+
+def is_group_break(
+    candles: CandleStore,
+    index: int,
+    interval_type: str,
     interval: int,
+    grouped_count: int
+) -> bool:
+    """
+    check whether candle at index starts a new group,
+    grouped_count is the number of candles in the group of previous candle
+    """
+    if index == 0 or grouped_count >= interval:
+        return True
+    elif candles.time_type_codes[index] != candles.time_type_codes[index - 1]:
+        return True
+
+    if is_intraday(interval_type):
+        interval_len = aktime.interval_type_to_msec(interval_type) * interval
+        prev_end_slot = candles.end_time_at(index - 1) // interval_len
+        if candles.end_time_at(index) // interval_len != prev_end_slot:
+            return True
+        return candles.start_time_at(index - 1) // interval_len != prev_end_slot
+    return False
+
+
+def group_firsts(
+    candles: CandleStore,
     interval_type: str,
-    first: PriceCandleProtocol,
-    candle: PriceCandleProtocol
-):
-    if first.time_type != candle.time_type:
-        return False
+    interval: int
+) -> numpy.ndarray:
+    """
+    index of the first candle of each group.
+    new group starts when time type changes, when group is filled with interval count
+    and for intraday candle, when candle end time leaves aligned interval of group's first candle.
+    candles are sorted by time, so comparing with previous candle is same as comparing with first one,
+    except first candle crossing its aligned interval which can not have any followers
+    """
+    count = len(candles)
+    types = candles.time_type_codes
+    breaks = numpy.empty(count, dtype=numpy.bool_)
+    breaks[0] = True
+    numpy.not_equal(types[1:], types[:-1], out=breaks[1:])
 
     # 일봉보다 작은 단위는 시간단위 연결 확인
-    if interval_type == 'm' or interval_type == 'h':
-        end_time = (first.start_time +
-                    (aktime.interval_type_to_msec(interval_type) * interval) - 1)
-        return candle.end_time <= end_time
-    return True
+    if is_intraday(interval_type):
+        interval_len = aktime.interval_type_to_msec(interval_type) * interval
+        start_slot = candles.start_times // interval_len
+        end_slot = candles.end_times // interval_len
+        breaks[1:] |= end_slot[1:] != end_slot[:-1]
+        breaks[1:] |= start_slot[:-1] != end_slot[:-1]
+
+    if interval == 1:
+        return numpy.arange(count)
+
+    segment_firsts = numpy.flatnonzero(breaks)
+    segment_index = numpy.cumsum(breaks) - 1
+    position = numpy.arange(count) - segment_firsts[segment_index]
+    return numpy.flatnonzero(position % interval == 0)
+
+
+def find_window(
+    start_times: numpy.ndarray,
+    start_time: int = 0,
+    end_time: int = 0,
+    count: int = 0
+) -> Tuple[int, int]:
+    """
+    [first, last) range of sorted start_times in [start_time, end_time],
+    narrowed to last count items when count is set. 0 means unbounded
+    """
+    first = int(numpy.searchsorted(start_times, start_time)) if start_time else 0
+    last = int(numpy.searchsorted(start_times, end_time, 'right')) if end_time else len(start_times)
+    if count:
+        first = max(first, last - count)
+    return first, max(first, last)
+
+
+def aggregate(
+    candles: CandleStore,
+    interval_type: str,
+    interval: int,
+    start_time: int = 0,
+    end_time: int = 0,
+    count: int = 0
+) -> CandleStore:
+    """
+    aggregated candles, window arguments are same as find_window
+    and only candles of groups in the window are reduced.
+    candles are only read, so snapshot of a store can be aggregated by many readers
+    """
+    if len(candles) == 0 or interval < 1:
+        return CandleStore()
+
+    firsts = group_firsts(candles, interval_type, interval)
+    start_times = candles.start_times[firsts]
+    if is_intraday(interval_type):
+        interval_len = aktime.interval_type_to_msec(interval_type) * interval
+        start_times -= start_times % interval_len
+
+    end = len(candles)
+    if start_time or end_time or count:
+        first, last = find_window(start_times, start_time, end_time, count)
+        if first == last:
+            return CandleStore()
+        if last < len(firsts):
+            end = int(firsts[last])
+        firsts = firsts[first:last]
+        start_times = start_times[first:last]
+    lasts = numpy.append(firsts[1:], end) - 1
+
+    return CandleStore.CreateFromColumns(
+        candles.opens[firsts],
+        numpy.maximum.reduceat(candles.highs[:end], firsts),
+        numpy.minimum.reduceat(candles.lows[:end], firsts),
+        candles.closes[lasts],
+        start_times,
+        candles.end_times[lasts],
+        numpy.add.reduceat(candles.base_volumes[:end], firsts),
+        numpy.add.reduceat(candles.quote_volumes[:end], firsts),
+        candles.time_type_codes[firsts],
+        candles.adjusted_flags[firsts]
+    )
 
 
 def get_candle(
-    candles: List[PriceCandleProtocol],
+    candles: Union[CandleStore, List[PriceCandleProtocol]],
     interval_type: str,
     interval: int,
     as_network: bool = True
 ) -> list:
-    if len(candles) == 0 or interval < 1:
-        return []
-
-    result = []
-    interval_len = aktime.interval_type_to_msec(interval_type) * interval
-    grouped: List[PriceCandleProtocol] = []
-    for data in candles:
-        if len(grouped) == 0 or _can_grouping(interval, interval_type, grouped[0], data):
-            if (interval_type == 'm' or interval_type == 'h') and len(grouped) == 0:
-                if data.start_time % interval_len != 0:
-                    data.adjust_start_time(data.start_time - (data.start_time % interval_len))
-
-            grouped.append(data)
-            if len(grouped) % interval == 0:
-                result.append(grouped.copy())
-                grouped.clear()
-        else:
-            result.append(grouped.copy())
-            grouped.clear()
-            if (interval_type == 'm' or interval_type == 'h') and len(grouped) == 0:
-                if data.start_time % interval_len != 0:
-                    data.adjust_start_time(data.start_time - (data.start_time % interval_len))
-            grouped.append(data)
-
-    if len(grouped) > 0:
-        result.append(grouped.copy())
-
-    arr = []
-    for candles in result:
-        current = None
-        for candle in candles:
-            if current is None:
-                current = candle
-            else:
-                current = current.merge(candle)
-        if current is not None:
-            if as_network:
-                arr.append(current.to_network())
-            else:
-                arr.append(current)
-    return arr
+    if not isinstance(candles, CandleStore):
+        candles = CandleStore.CreateFromCandles(candles)
+
+    grouped = aggregate(candles, interval_type, interval)
+    if as_network:
+        return grouped.to_network()
+    return grouped.to_candles()
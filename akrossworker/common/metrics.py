@@ -0,0 +1,110 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+
+# candle request phases
+AGGREGATION = 'aggregation'
+SERIALIZATION = 'serialization'
+TOTAL = 'total'
+PERCENTILES = (50, 90, 99)
+# each power of 2 range is split to 4 buckets, values up to 2^40
+BUCKET_COUNT = 156
+
+
+def _bucket_of(value: int) -> int:
+    if value < 8:
+        return value
+    shift = value.bit_length() - 3
+    return shift * 4 + (value >> shift)
+
+
+def _bucket_upper(bucket: int) -> int:
+    if bucket < 8:
+        return bucket
+    shift = bucket // 4 - 1
+    return ((bucket % 4 + 5) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    count of values by log scale buckets, 4 buckets per power of 2.
+    percentile is upper bound of the bucket, so it is accurate within 25%
+    """
+    def __init__(self):
+        self.buckets: List[int] = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value: int) -> None:
+        value = max(int(value), 0)
+        self.buckets[min(_bucket_of(value), BUCKET_COUNT - 1)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent: float) -> int:
+        if self.count == 0:
+            return 0
+        rank = self.count * percent / 100
+        accumulated = 0
+        for bucket, count in enumerate(self.buckets):
+            accumulated += count
+            if accumulated >= rank:
+                return min(_bucket_upper(bucket), self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        result = {
+            'count': self.count,
+            'mean': self.total / self.count if self.count > 0 else 0,
+            'max': self.max
+        }
+        for percent in PERCENTILES:
+            result[f'p{percent}'] = self.percentile(percent)
+        return result
+
+
+class RequestMetrics:
+    """
+    candle request latency in microseconds by phase, shared by caches of a rest cache
+    """
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {
+            AGGREGATION: LatencyHistogram(),
+            SERIALIZATION: LatencyHistogram(),
+            TOTAL: LatencyHistogram()
+        }
+
+    @contextmanager
+    def measure(self, phase: str):
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.histograms[phase].add((time.perf_counter_ns() - started) // 1000)
+
+    def to_dict(self) -> dict:
+        return {phase: histogram.to_dict() for phase, histogram in self.histograms.items()}
+
+
+def summarize(symbol_metrics: List[dict], request_metrics: RequestMetrics, count: int = 10) -> dict:
+    """
+    summary of CandleCache.get_metrics of symbols with top count symbols of each load
+    """
+    def top(key) -> List[dict]:
+        return [{'symbol': metrics['symbol'], 'value': key(metrics)}
+                for metrics in sorted(symbol_metrics, key=key, reverse=True)[:count]]
+
+    return {
+        'symbols': len(symbol_metrics),
+        'loaded': sum(1 for metrics in symbol_metrics if metrics['fetchDone']),
+        'bytes': sum(metrics['bytes'] for metrics in symbol_metrics),
+        'ticksPerSec': sum(metrics['ticksPerSec'] for metrics in symbol_metrics),
+        'candleRequestUs': request_metrics.to_dict(),
+        'topBytes': top(lambda metrics: metrics['bytes']),
+        'topTicksPerSec': top(lambda metrics: metrics['ticksPerSec']),
+        'topTickLatencyUs': top(lambda metrics: metrics['tickLatencyUs']['p99']),
+        'topTickLagMs': top(lambda metrics: metrics['tickLagMs']['p99'])
+    }
@@ -5,6 +5,19 @@ import uuid
 from akrossworker.common.args_constants import TickTimeType
 
 
+# candle document schema
+# version 1: prices, volumes and adjusted flag are strings in 'arr' list, has no 'v' field
+# version 2: native numeric fields, integral prices of integer_price market are stored as integer
+CANDLE_SCHEMA_VERSION = 2
+
+
+def _database_price(value, integer_price: bool) -> Union[int, float]:
+    value = float(value)
+    if integer_price and value.is_integer():
+        return int(value)
+    return value
+
+
 class PriceCandleProtocol:
     def __init__(self,
                  price_open: float,
@@ -86,9 +99,6 @@ class PriceCandleProtocol:
     def start_time(self) -> int:
         return self._start_time
     
-    def adjust_start_time(self, start_time: int) -> None:
-        self._start_time = start_time
-
     @property
     def end_time(self) -> int:
         return self._end_time
@@ -123,7 +133,21 @@ class PriceCandleProtocol:
             self._time_type,
             '1' if self._adjusted else '0']
 
-    def to_database(self):
+    def to_database(self, version: int = CANDLE_SCHEMA_VERSION, integer_price: bool = False):
+        if version >= 2:
+            return {
+                'v': 2,
+                'startTime': self._start_time,
+                'endTime': self._end_time,
+                'timeType': self._time_type,
+                'open': _database_price(self._price_open, integer_price),
+                'high': _database_price(self._price_high, integer_price),
+                'low': _database_price(self._price_low, integer_price),
+                'close': _database_price(self._price_close, integer_price),
+                'baseVolume': float(self._base_asset_volume),
+                'quoteVolume': float(self._quote_asset_volume),
+                'adjusted': bool(self._adjusted)
+            }
         return {
             'startTime': self._start_time,
             'endTime': self._end_time,
@@ -184,6 +208,18 @@ class PriceCandleProtocol:
 
     @classmethod
     def ParseDatabase(cls, row: dict) -> PriceCandleProtocol:
+        if row.get('v', 1) >= 2:
+            return PriceCandleProtocol(
+                float(row['open']),
+                float(row['high']),
+                float(row['low']),
+                float(row['close']),
+                int(row['startTime']), int(row['endTime']),
+                float(row['baseVolume']),
+                float(row['quoteVolume']),
+                row['timeType'],
+                bool(row['adjusted'])
+            )
         return PriceCandleProtocol(
             float(row['arr'][0]),
             float(row['arr'][1]),
@@ -586,6 +622,9 @@ class PlanItem:
 
 
 class PriceStreamProtocol:
+    # created for every tick, keep it compact
+    __slots__ = ('symbol', 'price', 'event_time', 'volume', 'is_buy', 'time_type')
+
     def __init__(
         self,
         symbol: str,
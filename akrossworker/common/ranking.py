@@ -0,0 +1,86 @@
+import heapq
+from typing import Dict, List, Tuple
+
+
+# ranking keys updated by CandleCache
+TRIANGLE_SCORE = 'triangle'
+AMOUNT_RATIO = 'amountRatio'
+
+
+def amount_ratio_key(time_type: str) -> str:
+    # traded amount / market cap, ranked separately for each time type
+    return AMOUNT_RATIO + ':' + time_type
+
+
+class Ranking:
+    """
+    scores of symbols kept in a max heap, updating a score pushes a new entry
+    and old entries are skipped when they are popped (lazy deletion).
+    heap is rebuilt when stale entries are more than live ones
+    """
+    def __init__(self):
+        self._scores: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._scores
+
+    def get_score(self, symbol: str) -> float:
+        return self._scores.get(symbol, 0)
+
+    def update(self, symbol: str, score: float) -> None:
+        if self._scores.get(symbol) == score:
+            return
+        self._scores[symbol] = score
+        heapq.heappush(self._heap, (-score, symbol))
+        if len(self._heap) > len(self._scores) * 2 + 64:
+            self._compact()
+
+    def remove(self, symbol: str) -> None:
+        self._scores.pop(symbol, None)
+
+    def _compact(self) -> None:
+        self._heap = [(-score, symbol) for symbol, score in self._scores.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, count: int) -> List[Tuple[str, float]]:
+        result = []
+        while self._heap and len(result) < count:
+            negative_score, symbol = heapq.heappop(self._heap)
+            if self._scores.get(symbol) == -negative_score and (
+                    len(result) == 0 or result[-1][0] != symbol):
+                result.append((symbol, -negative_score))
+        for symbol, score in result:
+            heapq.heappush(self._heap, (-score, symbol))
+        return result
+
+
+class RankingBoard:
+    """
+    rankings by key, new screener only needs to update its own key
+    """
+    def __init__(self):
+        self._rankings: Dict[str, Ranking] = {}
+
+    def get_ranking(self, key: str) -> Ranking:
+        if key not in self._rankings:
+            self._rankings[key] = Ranking()
+        return self._rankings[key]
+
+    def update(self, key: str, symbol: str, score: float) -> None:
+        self.get_ranking(key).update(symbol, score)
+
+    def remove(self, key: str, symbol: str) -> None:
+        if key in self._rankings:
+            self._rankings[key].remove(symbol)
+
+    def top(self, key: str, count: int) -> List[str]:
+        return [symbol for symbol, _ in self.top_scores(key, count)]
+
+    def top_scores(self, key: str, count: int) -> List[Tuple[str, float]]:
+        if key not in self._rankings:
+            return []
+        return self._rankings[key].top(count)
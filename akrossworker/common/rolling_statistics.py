@@ -0,0 +1,70 @@
+import math
+from collections import deque
+
+
+class RollingStatistics:
+    """
+    statistics of last window candles, adding a candle removes the oldest one.
+    mean and variance of close are kept by Welford's method with removal,
+    so every update and query is O(1). rounding error of removal is reset by
+    recomputing from window after every window removals (amortized O(1))
+    """
+    def __init__(self, window: int):
+        self.window = window
+        self._candles = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._base_volume = 0.0
+        self._quote_volume = 0.0
+        self._removed = 0
+
+    def __len__(self) -> int:
+        return len(self._candles)
+
+    def add(self, price: float, base_volume: float, quote_volume: float) -> None:
+        self._candles.append((price, base_volume, quote_volume))
+        delta = price - self._mean
+        self._mean += delta / len(self._candles)
+        self._m2 += delta * (price - self._mean)
+        self._base_volume += base_volume
+        self._quote_volume += quote_volume
+        if len(self._candles) > self.window:
+            self._remove(*self._candles.popleft())
+
+    def _remove(self, price: float, base_volume: float, quote_volume: float) -> None:
+        count = len(self._candles)
+        delta = price - self._mean
+        self._mean -= delta / count
+        self._m2 = max(self._m2 - delta * (price - self._mean), 0.0)
+        self._base_volume -= base_volume
+        self._quote_volume -= quote_volume
+        self._removed += 1
+        if self._removed >= self.window:
+            self._recompute()
+
+    def _recompute(self) -> None:
+        self._removed = 0
+        self._mean = sum(price for price, _, _ in self._candles) / len(self._candles)
+        self._m2 = sum((price - self._mean) ** 2 for price, _, _ in self._candles)
+        self._base_volume = sum(base_volume for _, base_volume, _ in self._candles)
+        self._quote_volume = sum(quote_volume for _, _, quote_volume in self._candles)
+
+    def mean(self) -> float:
+        return self._mean if len(self._candles) > 0 else 0
+
+    def variance(self) -> float:
+        # population variance of closes in window
+        return self._m2 / len(self._candles) if len(self._candles) > 0 else 0
+
+    def stddev(self) -> float:
+        return math.sqrt(self.variance())
+
+    def coefficient_variation(self) -> float:
+        mean = self.mean()
+        return self.stddev() / mean if mean > 0 else 0
+
+    def vwap(self) -> float:
+        return self._quote_volume / self._base_volume if self._base_volume > 0 else 0
+
+    def amount(self) -> float:
+        return self._quote_volume
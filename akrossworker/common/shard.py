@@ -0,0 +1,227 @@
+import asyncio
+import heapq
+import json
+import logging
+import multiprocessing
+import os
+import struct
+import sys
+import zlib
+from typing import Callable, Dict, Iterable, List
+
+from akross.rpc.base import RpcBase
+
+
+LOGGER = logging.getLogger(__name__)
+# 1 runs rest cache in a single process as before
+SHARD_COUNT = int(os.getenv('AKROSS_SHARD_COUNT', '1'))
+# shard i listens on SHARD_PORT + i of localhost
+SHARD_PORT = int(os.getenv('AKROSS_SHARD_PORT', '17100'))
+SHARD_CONNECT_TIMEOUT = 600  # seconds, shards finish preload before listening
+FRAME_HEADER = struct.Struct('<I')
+# kwargs of a scatter command to ask shards for [network data, score] pairs
+WITH_SCORE = 'withScore'
+LOG_FORMAT = ('%(levelname) -10s %(asctime)s %(name) -30s %(funcName) '
+              '-35s %(lineno) -5d: %(message)s')
+
+
+def shard_of(symbol: str, shard_count: int) -> int:
+    # crc32 is stable across processes unlike hash() of str
+    return zlib.crc32(symbol.lower().encode()) % shard_count
+
+
+async def _read_frame(reader: asyncio.StreamReader):
+    header = await reader.readexactly(FRAME_HEADER.size)
+    return json.loads(await reader.readexactly(FRAME_HEADER.unpack(header)[0]))
+
+
+def _write_frame(writer: asyncio.StreamWriter, data) -> None:
+    payload = json.dumps(data).encode()
+    writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+
+
+class ShardServer:
+    """
+    serve rpc commands of a rest cache owning a part of symbols to the router.
+    frame is length prefixed json of {'id', 'command', 'kwargs'} and {'id', 'result'},
+    only commands routed by the router are served
+    """
+    def __init__(self, provider: RpcBase, commands: Iterable[str]):
+        self.provider = provider
+        self.commands = set(commands)
+
+    async def _call(self, request: dict, writer: asyncio.StreamWriter) -> None:
+        if request.get('command') not in self.commands:
+            LOGGER.error('reject shard command %s', request.get('command'))
+            _write_frame(writer, {'id': request.get('id'), 'error': 'unknown command'})
+            await writer.drain()
+            return
+        try:
+            result = await getattr(self.provider, request['command'])(**request['kwargs'])
+            _write_frame(writer, {'id': request['id'], 'result': result})
+        except Exception as e:
+            LOGGER.error('shard command %s failed %s', request['command'], str(e))
+            _write_frame(writer, {'id': request['id'], 'error': str(e)})
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await _read_frame(reader)
+                asyncio.create_task(self._call(request, writer))
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    async def serve(self, port: int) -> None:
+        server = await asyncio.start_server(self._handle, '127.0.0.1', port)
+        async with server:
+            await server.serve_forever()
+
+
+class ShardClient:
+    def __init__(self, port: int):
+        self.port = port
+        self._writer: asyncio.StreamWriter = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._request_id = 0
+
+    async def connect(self, timeout: int = SHARD_CONNECT_TIMEOUT) -> None:
+        for _ in range(timeout):
+            try:
+                reader, self._writer = await asyncio.open_connection('127.0.0.1', self.port)
+                asyncio.create_task(self._receive(reader))
+                return
+            except OSError:
+                await asyncio.sleep(1)
+        raise ConnectionError(f'cannot connect to shard port {self.port}')
+
+    async def _receive(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                response = await _read_frame(reader)
+                future = self._pending.pop(response['id'], None)
+                if future is None or future.done():
+                    continue
+                if 'error' in response:
+                    future.set_exception(RuntimeError(response['error']))
+                else:
+                    future.set_result(response['result'])
+        except asyncio.IncompleteReadError:
+            LOGGER.error('shard port %d is disconnected', self.port)
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f'shard port {self.port} is disconnected'))
+            self._pending.clear()
+
+    async def call(self, command: str, **kwargs):
+        self._request_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._request_id] = future
+        _write_frame(self._writer, {'id': self._request_id, 'command': command, 'kwargs': kwargs})
+        await self._writer.drain()
+        return await future
+
+
+class ShardRouter(RpcBase):
+    """
+    registered to the bus in place of rest cache and forwards commands to shards.
+    symbol_commands: sent to the shard owning kwargs['symbol'], to all shards without symbol
+    scatter_commands: sent to all shards with WITH_SCORE, top scored results are merged
+    other commands are answered by the first shard (symbol master is in every shard)
+    """
+    def __init__(
+        self,
+        clients: List[ShardClient],
+        symbol_commands: List[str],
+        scatter_commands: Dict[str, int],
+        other_commands: List[str]
+    ):
+        super().__init__()
+        self.clients = clients
+        for command in symbol_commands:
+            setattr(self, command, self._route_symbol(command))
+        for command, count in scatter_commands.items():
+            setattr(self, command, self._scatter(command, count))
+        for command in other_commands:
+            setattr(self, command, self._route_first(command))
+
+    def _route_symbol(self, command: str) -> Callable:
+        async def route(**kwargs):
+            if 'symbol' not in kwargs:
+                return await asyncio.gather(*[client.call(command, **kwargs) for client in self.clients])
+            client = self.clients[shard_of(kwargs['symbol'], len(self.clients))]
+            return await client.call(command, **kwargs)
+        return route
+
+    def _scatter(self, command: str, count: int) -> Callable:
+        async def scatter(**kwargs):
+            kwargs[WITH_SCORE] = True
+            results = await asyncio.gather(
+                *[client.call(command, **kwargs) for client in self.clients])
+            merged = heapq.nlargest(count, [item for result in results for item in result],
+                                    key=lambda item: item[1])
+            return [data for data, _ in merged]
+        return scatter
+
+    def _route_first(self, command: str) -> Callable:
+        async def route(**kwargs):
+            return await self.clients[0].call(command, **kwargs)
+        return route
+
+
+def _run_shard(create_provider: Callable, shard_index: int, shard_count: int, commands: List[str]) -> None:
+    # spawned process imports the main module without running its __main__ block,
+    # so logging of the router is not configured here
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+    async def run():
+        provider = create_provider(shard_index, shard_count)
+        await provider.preload()
+        LOGGER.warning('shard %d/%d is ready', shard_index, shard_count)
+        await ShardServer(provider, commands).serve(SHARD_PORT + shard_index)
+    asyncio.run(run())
+
+
+async def _watch_shards(processes: List[multiprocessing.process.BaseProcess]) -> None:
+    # router exits with shards, e.g. when caches are turned off at night
+    while all(process.is_alive() for process in processes):
+        await asyncio.sleep(1)
+    LOGGER.error('shard exited, turn off router')
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    sys.exit(0)
+
+
+async def start_shards(create_provider: Callable, shard_count: int, commands: List[str]) -> List[ShardClient]:
+    """
+    create_provider(shard_index, shard_count) should be picklable (module level function),
+    shards serve commands only.
+    shards are spawned instead of forked, router already runs an event loop and
+    connections which cannot be shared with a child process
+    """
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for shard_index in range(shard_count):
+        process = context.Process(
+            target=_run_shard, args=(create_provider, shard_index, shard_count, commands), daemon=True)
+        process.start()
+        processes.append(process)
+    asyncio.create_task(_watch_shards(processes))
+
+    clients = [ShardClient(SHARD_PORT + shard_index) for shard_index in range(shard_count)]
+    await asyncio.gather(*[client.connect() for client in clients])
+    LOGGER.warning('%d shards are connected', shard_count)
+    return clients
+
+
+async def create_router(
+    create_provider: Callable,
+    shard_count: int,
+    symbol_commands: List[str],
+    scatter_commands: Dict[str, int],
+    other_commands: List[str]
+) -> ShardRouter:
+    commands = symbol_commands + list(scatter_commands) + other_commands
+    clients = await start_shards(create_provider, shard_count, commands)
+    return ShardRouter(clients, symbol_commands, scatter_commands, other_commands)
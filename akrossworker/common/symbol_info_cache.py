@@ -0,0 +1,52 @@
+from typing import Dict, Iterable, List, Optional, Union
+
+from akrossworker.common.protocol import SymbolInfo
+
+
+class SymbolInfoCache:
+    """
+    network payload of symbol infos, built once when symbol master is set.
+    version is increased only when payload is changed, so refreshing with
+    same symbol master keeps the cached payload and its subsets
+    """
+    def __init__(self):
+        self.version = 0
+        self._payload: List[dict] = []
+        self._by_status: Dict[str, List[dict]] = {}
+        self._by_sector: Dict[str, List[dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self._payload)
+
+    def update(self, symbol_infos: Iterable[SymbolInfo]) -> bool:
+        payload = [symbol_info.to_network() for symbol_info in symbol_infos]
+        if payload == self._payload:
+            return False
+
+        by_status: Dict[str, List[dict]] = {}
+        by_sector: Dict[str, List[dict]] = {}
+        for data in payload:
+            by_status.setdefault(data['status'], []).append(data)
+            for sector in set(data['sectors']):
+                by_sector.setdefault(sector, []).append(data)
+        self._payload, self._by_status, self._by_sector = payload, by_status, by_sector
+        self.version += 1
+        return True
+
+    def get(
+        self,
+        status: Optional[str] = None,
+        sectors: Optional[Union[List[str], str]] = None
+    ) -> List[dict]:
+        # returned lists are shared, caller should not modify them
+        if sectors is not None:
+            sectors = sectors if isinstance(sectors, list) else [sectors]
+            if len(sectors) > 0:
+                # start from smallest subset and check other conditions on it
+                sectors = sorted(sectors, key=lambda sector: len(self._by_sector.get(sector, [])))
+                return [data for data in self._by_sector.get(sectors[0], [])
+                        if (status is None or data['status'] == status)
+                        and all(sector in data['sectors'] for sector in sectors[1:])]
+        if status is not None:
+            return self._by_status.get(status, [])
+        return self._payload
@@ -0,0 +1,101 @@
+from typing import Dict, Iterable, List, Optional, Union
+
+from akrossworker.common.protocol import SymbolInfo
+
+
+# keyword shorter than GRAM_SIZE is looked up by its length of grams
+GRAM_SIZE = 2
+
+
+def _grams(text: str, size: int) -> set:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _bits(bitmap: int) -> Iterable[int]:
+    while bitmap:
+        lowest = bitmap & -bitmap
+        yield lowest.bit_length() - 1
+        bitmap ^= lowest
+
+
+class SymbolSearchIndex:
+    """
+    keyword and sector search over symbol infos, built once when symbols are registered.
+    symbol and desc are lowercased and split to grams (1 to GRAM_SIZE characters),
+    each gram and sector keeps a bitmap of symbol ids, so query is an AND of bitmaps
+    and only candidates are checked with substring match.
+    result is same as CandleCache.symbol_matched, ordered by exact, prefix and substring match
+    """
+    def __init__(self, symbol_infos: Iterable[SymbolInfo]):
+        self.symbol_infos: List[SymbolInfo] = list(symbol_infos)
+        self._names: List[tuple] = []
+        self._grams: Dict[str, int] = {}
+        self._sectors: Dict[str, int] = {}
+        self._all = (1 << len(self.symbol_infos)) - 1
+
+        for symbol_id, symbol_info in enumerate(self.symbol_infos):
+            bit = 1 << symbol_id
+            names = (symbol_info.symbol.lower(), symbol_info.desc.lower())
+            self._names.append(names)
+            grams = set()
+            for size in range(1, GRAM_SIZE + 1):
+                for name in names:
+                    grams |= _grams(name, size)
+            for gram in grams:
+                self._grams[gram] = self._grams.get(gram, 0) | bit
+            for sector in set(symbol_info.sectors):
+                self._sectors[sector] = self._sectors.get(sector, 0) | bit
+
+    def __len__(self) -> int:
+        return len(self.symbol_infos)
+
+    def _keyword_bitmap(self, keyword: str) -> int:
+        size = min(len(keyword), GRAM_SIZE)
+        bitmap = self._all
+        for gram in _grams(keyword, size):
+            bitmap &= self._grams.get(gram, 0)
+            if bitmap == 0:
+                break
+        return bitmap
+
+    def _sector_bitmap(self, sectors: Union[List[str], str]) -> int:
+        sectors = sectors if isinstance(sectors, list) else [sectors]
+        bitmap = self._all
+        for sector in sectors:
+            bitmap &= self._sectors.get(sector, 0)
+        return bitmap
+
+    def _rank(self, symbol_id: int, keyword: str) -> int:
+        names = self._names[symbol_id]
+        if keyword in names:
+            return 0
+        elif names[0].startswith(keyword) or names[1].startswith(keyword):
+            return 1
+        return 2
+
+    def search(
+        self,
+        keyword: Optional[str] = None,
+        sectors: Optional[Union[List[str], str]] = None,
+        limit: int = 0
+    ) -> List[SymbolInfo]:
+        if keyword is None and sectors is None:
+            return []
+
+        bitmap = self._all
+        if sectors is not None:
+            bitmap &= self._sector_bitmap(sectors)
+        if keyword is None:
+            ids = list(_bits(bitmap))
+        else:
+            keyword = keyword.lower()
+            if len(keyword) > 0:
+                bitmap &= self._keyword_bitmap(keyword)
+            # grams can match in different positions, check candidates with substring
+            ids = [symbol_id for symbol_id in _bits(bitmap)
+                   if keyword in self._names[symbol_id][0] or keyword in self._names[symbol_id][1]]
+            ids.sort(key=lambda symbol_id: self._rank(symbol_id, keyword))
+
+        if limit > 0:
+            ids = ids[:limit]
+        return [self.symbol_infos[symbol_id] for symbol_id in ids]
@@ -1,7 +1,12 @@
 import logging
+import os
+import struct
+import time
 from typing import List, Optional
 from datetime import datetime
 
+import numpy
+
 from akross.connection.aio.quote_channel import QuoteChannel, Market
 from akross.common import aktime
 from akrossworker.common.args_constants import (
@@ -10,7 +15,9 @@ from akrossworker.common.args_constants import (
     CandleLimitCount
 )
 from akrossworker.common.command import ApiCommand
-from akrossworker.common import grouping
+from akrossworker.common import candle_codec, grouping
+from akrossworker.common.candle_store import CandleStore, DATABASE_PROJECTION
+from akrossworker.common.candle_view import CandleView
 
 from akrossworker.common.db import Database
 from akrossworker.common.protocol import (
@@ -19,9 +26,13 @@ from akrossworker.common.protocol import (
     SymbolInfo
 )
 from akrossworker.common.volatility_calculator import VolatilityCalculator
+from akrossworker.common.watermark import shared_catalog
+from akrossworker.common.warmup import WarmupScheduler
 
 
 LOGGER = logging.getLogger(__name__)
+# seconds, older snapshot is ignored and candles are read from database
+SNAPSHOT_MAX_AGE = int(os.getenv('AKROSS_CACHE_SNAPSHOT_MAX_AGE', str(12 * 3600)))
 
 
 class UnitCandle:
@@ -41,7 +52,8 @@ class UnitCandle:
         self.db_name = db_name
         self.interval_type = interval_type
         self.fetch_done = False
-        self.data: List[PriceCandleProtocol] = []
+        self.data = CandleStore(self.get_limit_count())
+        self.views: List[CandleView] = []
         self.last_price = 0
         if self.interval_type == 'm':
             self.volatility_calculator = VolatilityCalculator(aktime.get_msec())
@@ -82,25 +94,95 @@ class UnitCandle:
     def get_candle(self, interval: int) -> list:
         return grouping.get_candle(self.data, self.interval_type, interval)
 
-    def get_raw_candle(self) -> List[PriceCandleProtocol]:
+    def get_raw_candle(self) -> CandleStore:
         return self.data
 
-    async def fetch(self):
+    def create_view(self, interval: int) -> CandleView:
+        view = CandleView(self.data, self.interval_type, interval)
+        self.views.append(view)
+        return view
+
+    def remove_view(self, view: CandleView) -> None:
+        if view in self.views:
+            self.views.remove(view)
+
+    def get_snapshot_path(self, snapshot_dir: str) -> str:
+        return os.path.join(
+            snapshot_dir, self.db_name,
+            self.symbol_info.symbol.lower() + '_1' + self.interval_type + '.akcd')
+
+    def encode_snapshot(self, now: int) -> bytes:
+        """
+        completed candles only, candle in progress is fetched again after restore
+        """
+        completed = int(numpy.searchsorted(self.data.end_times, now))
+        return candle_codec.encode(self.data[:completed])
+
+    def load_snapshot(self, snapshot_dir: str, now: int) -> Optional[CandleStore]:
+        """
+        completed candles of snapshot in cache range, None when it is missing or too old
+        """
+        path = self.get_snapshot_path(snapshot_dir)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            if time.time() - os.path.getmtime(path) > SNAPSHOT_MAX_AGE:
+                LOGGER.warning('snapshot %s is too old', path)
+                return None
+            store = candle_codec.read_file(path)
+        except (OSError, ValueError, struct.error) as e:
+            LOGGER.warning('cannot restore snapshot %s: %s', path, str(e))
+            return None
+
+        first = int(numpy.searchsorted(store.start_times, self.get_db_start_search()))
+        last = int(numpy.searchsorted(store.end_times, now))
+        if first >= last:
+            return None
+        return store[first:last]
+
+    async def get_stored_snapshot(self, col: str, store: CandleStore) -> Optional[CandleStore]:
+        """
+        candles of snapshot up to last end time of database in catalog,
+        later candles are built from ticks or api and fetched again from api,
+        candles deleted from database after snapshot is saved are also dropped
+        """
+        last_end = await shared_catalog(self.db, self.db_name).find_latest_ms(col)
+        stored = int(numpy.searchsorted(store.end_times, last_end, side='right'))
+        if stored == 0:
+            LOGGER.warning('%s database ends before snapshot, ignore snapshot', col)
+            return None
+        return store[:stored]
+
+    async def fetch(self, scheduler: Optional[WarmupScheduler] = None, snapshot_dir: str = ''):
         """
-        check when extended time and normal time mixed
+        check when extended time and normal time mixed,
+        when snapshot is restored, only candles after it are read from database
         """
+        if scheduler is None:
+            scheduler = WarmupScheduler(0, 0)
         db_last_record = 0
         col = self.symbol_info.symbol.lower() + '_1' + self.interval_type
         # LOGGER.info('%s', col)
         now = aktime.get_msec()
         krx_start_time = aktime.get_start_time(now, 'd', self.symbol_info.tz) + aktime.interval_type_to_msec('h') * 9
-        stored = await self.db.get_data(
-            self.db_name, col, {'startTime': {'$gte': self.get_db_start_search()}})
+        db_start = self.get_db_start_search()
+        async with scheduler.db_slot():
+            store = self.load_snapshot(snapshot_dir, now) if snapshot_dir else None
+            if store is not None:
+                store = await self.get_stored_snapshot(col, store)
+            if store is not None:
+                self.data.extend_store(store)
+                self.last_price = self.data.price_close_at(-1)
+                db_start = max(db_start, self.data.end_time_at(-1) + 1)
 
-        for data in stored:
-            candle = PriceCandleProtocol.ParseDatabase(data)
-            if candle.end_time < now:
-                self.data.append(candle)
+            async for batch in self.db.get_raw_batches(
+                    self.db_name, col, {'startTime': {'$gte': db_start}},
+                    DATABASE_PROJECTION):
+                self.data.extend_database_batch(batch, now)
+        if self.volatility_calculator is not None:
+            # candles of today from snapshot and database, api candles are added below
+            self.volatility_calculator.add_complete_store(self.data)
 
         query = {
             'cache': False,
@@ -109,16 +191,17 @@ class UnitCandle:
             'timeout': 180
         }
         if len(self.data) > 0:
+            db_last_record = self.data.end_time_at(-1)
             LOGGER.info('%s db last time %s',
-                        col, datetime.fromtimestamp(int(self.data[-1].end_time / 1000)))
-            query['startTime'] = self.data[-1].end_time + 1
+                        col, datetime.fromtimestamp(int(db_last_record / 1000)))
+            query['startTime'] = db_last_record + 1
             query['endTime'] = now
-            db_last_record = self.data[-1].end_time
         else:
             pass
 
-        ret, resp = await self.conn.api_call(
-            self.market, ApiCommand.Candle, **query)
+        async with scheduler.rpc_slot():
+            ret, resp = await self.conn.api_call(
+                self.market, ApiCommand.Candle, **query)
 
         if resp is not None and isinstance(resp, list):
             LOGGER.info('api query %s, data len(%d)', query, len(resp))
@@ -135,16 +218,18 @@ class UnitCandle:
                     """
                     if candle.start_time <= now <= candle.end_time and now < krx_start_time:
                         continue
-                self.data.append(candle)
+                self.data.append_candle(candle)
                 self.last_price = float(candle.price_close)
                 if self.volatility_calculator is not None:
                     self.volatility_calculator.add_complete_candle(candle)
         else:
             LOGGER.error('fetch error(%s) interval:%s',
                          self.symbol_info.symbol, self.interval_type)
+        for view in self.views:
+            view.invalidate()
         self.fetch_done = True
 
-    async def add_new_candle(self, s: PriceStreamProtocol, last_start: int = 0):
+    def add_new_candle(self, s: PriceStreamProtocol, last_start: int = 0):
         # col = self.symbol_info.symbol.lower() + '_1' + self.interval_type
         start_time = self.get_start_time(s.event_time, last_start)
         end_time = self.get_end_time(start_time)
@@ -152,47 +237,97 @@ class UnitCandle:
         if self.volatility_calculator is not None and len(self.data) > 0:
             self.volatility_calculator.add_complete_candle(self.data[-1])
 
-        self.data.append(PriceCandleProtocol.CreatePriceCandle(
-            s.price, s.price, s.price, s.price,
+        price = s.price
+        trimmed = len(self.data) >= self.get_limit_count()
+        self.data.append(
+            price, price, price, price,
             start_time, end_time,
-            s.volume, float(s.volume) * float(s.price),
+            s.volume, s.volume * price,
             s.time_type
-        ))
-
-        if len(self.data) > self.get_limit_count():
-            self.data = self.data[-self.get_limit_count():]
+        )
+        for view in self.views:
+            if trimmed:
+                view.on_source_trimmed()
+            view.on_source_appended()
 
     def _is_apply_extended(self):
         if self.interval_type == 'm' or self.interval_type == 'h':
             return True
         return False
 
-    async def update_stream_data(self, stream: list):
-        if not self.fetch_done:
-            return
-
-        s = PriceStreamProtocol.ParseNetwork(stream)
+    def update_stream_data(self, s: PriceStreamProtocol):
+        """
+        called by CandleCache after every interval type is fetched,
+        s is parsed once and shared with other interval types, price and volume are already float
+        """
         if self.volatility_calculator is not None:
             self.volatility_calculator.update_amount(s)
-        self.last_price = float(s.price)
+        self.last_price = s.price
         if not self._is_apply_extended() and s.time_type != TickTimeType.Normal:
             return
         elif len(self.data) == 0:
-            await self.add_new_candle(s)
+            self.add_new_candle(s)
         else:
-            last_candle = self.data[-1]
-            if s.event_time > last_candle.end_time:
-                await self.add_new_candle(s)
-            elif s.event_time >= last_candle.start_time and s.event_time <= last_candle.end_time:
-                if s.time_type != last_candle.time_type:
-                    await self.add_new_candle(s, last_candle.start_time)
+            last_start = self.data.start_time_at(-1)
+            last_end = self.data.end_time_at(-1)
+            if s.event_time > last_end:
+                self.add_new_candle(s)
+            elif s.event_time >= last_start and s.event_time <= last_end:
+                if s.time_type != self.data.time_type_at(-1):
+                    self.add_new_candle(s, last_start)
                 else:
-                    last_candle.price_close = s.price
-                    if float(s.price) > last_candle.price_high:
-                        last_candle.price_high = s.price
-                    if float(s.price) < last_candle.price_low:
-                        last_candle.price_low = s.price
-                    last_candle.add_base_asset_volume(s.volume)
-                    last_candle.add_quote_asset_volume(float(s.volume) * float(s.price))
+                    quote_volume = s.volume * s.price
+                    self.data.update_last(s.price, s.volume, quote_volume)
+                    for view in self.views:
+                        view.on_source_updated(s.price, s.volume, quote_volume)
             else:
                 pass  # stream time is past
+
+    def _update_last_batch(self, streams: List[PriceStreamProtocol]) -> None:
+        prices = [s.price for s in streams]
+        volumes = [s.volume for s in streams]
+        quote_volumes = [s.volume * s.price for s in streams]
+        high, low = max(prices), min(prices)
+        self.data.update_last_batch(prices[-1], high, low, volumes, quote_volumes)
+        for view in self.views:
+            view.on_source_batch_updated(prices[-1], high, low, volumes, quote_volumes)
+
+    def update_stream_batch(self, streams: List[PriceStreamProtocol]):
+        """
+        same result as update_stream_data of each stream in order,
+        consecutive streams on the last candle are folded into one update
+        """
+        apply_extended = self._is_apply_extended()
+        folded: List[PriceStreamProtocol] = []
+        last_start = last_end = 0
+        last_time_type = ''
+        for s in streams:
+            if self.volatility_calculator is not None:
+                self.volatility_calculator.update_amount(s)
+            self.last_price = s.price
+            if not apply_extended and s.time_type != TickTimeType.Normal:
+                continue
+            elif len(folded) > 0 and s.time_type == last_time_type and \
+                    last_start <= s.event_time <= last_end:
+                folded.append(s)
+                continue
+
+            if len(folded) > 0:
+                self._update_last_batch(folded)
+                folded = []
+            if len(self.data) == 0:
+                self.add_new_candle(s)
+                continue
+
+            last_start = self.data.start_time_at(-1)
+            last_end = self.data.end_time_at(-1)
+            last_time_type = self.data.time_type_at(-1)
+            if s.event_time > last_end:
+                self.add_new_candle(s)
+            elif s.event_time >= last_start and s.event_time <= last_end:
+                if s.time_type != last_time_type:
+                    self.add_new_candle(s, last_start)
+                else:
+                    folded.append(s)
+        if len(folded) > 0:
+            self._update_last_batch(folded)
@@ -1,14 +1,24 @@
-from typing import Dict
+from typing import Dict, Iterable
+
+import numpy
+
 from akrossworker.common.args_constants import TickTimeType
+from akrossworker.common.candle_store import CandleStore, time_type_to_code
 from akrossworker.common.protocol import (
     PriceCandleProtocol,
     PriceStreamProtocol
 )
+from akrossworker.common.rolling_statistics import RollingStatistics
 from akross.common import aktime
 
 
+# rolling statistics are kept for last N minute candles of today's normal session
+ROLLING_WINDOWS = (5, 20, 60)
+DEFAULT_WINDOW = 20
+
+
 class VolatilityCalculator:
-    def __init__(self, ms: int):
+    def __init__(self, ms: int, windows: Iterable[int] = ROLLING_WINDOWS):
         self.today_start = aktime.get_start_time(ms, 'd', 'KRX')
         self.count = 0
         self.high = 0
@@ -17,14 +27,23 @@ class VolatilityCalculator:
         self.low_index = 0
         self.start_price = 0
         self.time_type_amount: Dict[str, int] = {}
+        self.rolling: Dict[int, RollingStatistics] = {
+            window: RollingStatistics(window) for window in windows}
+        # normal session ticks for vwap of today
+        self.session_volume = 0.0
+        self.session_amount = 0.0
 
-    def add_complete_candle(self, candle: PriceCandleProtocol):
-        if (candle.time_type != TickTimeType.Normal or candle.start_time < self.today_start):
-            return
-        low = float(candle.price_low)
-        high = float(candle.price_high)
+    def _add_complete(
+        self,
+        price_open: float,
+        high: float,
+        low: float,
+        price_close: float,
+        base_volume: float,
+        quote_volume: float
+    ):
         if self.start_price == 0:
-            self.start_price = float(candle.price_open)
+            self.start_price = price_open
         if self.high == 0 or high > self.high:
             self.high = high
             self.high_index = self.count
@@ -32,6 +51,51 @@ class VolatilityCalculator:
             self.low = low
             self.low_index = self.count
         self.count += 1
+        for statistics in self.rolling.values():
+            statistics.add(price_close, base_volume, quote_volume)
+
+    def add_complete_candle(self, candle: PriceCandleProtocol):
+        if (candle.time_type != TickTimeType.Normal or candle.start_time < self.today_start):
+            return
+        self._add_complete(
+            float(candle.price_open), float(candle.price_high),
+            float(candle.price_low), float(candle.price_close),
+            float(candle.base_asset_volume), float(candle.quote_asset_volume))
+
+    def add_complete_store(self, store: CandleStore):
+        """
+        add today's normal candles of store in order, same as add_complete_candle of each row
+        """
+        rows = numpy.flatnonzero(
+            (store.time_type_codes == time_type_to_code(TickTimeType.Normal)) &
+            (store.start_times >= self.today_start))
+        if len(rows) == 0:
+            return
+        columns = [getattr(store, column)[rows].tolist() for column in
+                   ('opens', 'highs', 'lows', 'closes', 'base_volumes', 'quote_volumes')]
+        for row in zip(*columns):
+            self._add_complete(*row)
+
+    def get_statistics(self, window: int = DEFAULT_WINDOW) -> RollingStatistics:
+        return self.rolling[window]
+
+    def is_under_mean(self, price: float, window: int = DEFAULT_WINDOW) -> bool:
+        statistics = self.rolling[window]
+        return len(statistics) > 0 and price < statistics.mean()
+
+    def get_coefficient_variation(self, window: int = DEFAULT_WINDOW) -> float:
+        return self.rolling[window].coefficient_variation()
+
+    def get_vwap(self, window: int = 0) -> float:
+        """
+        vwap of today's normal session ticks, or of last window candles
+        """
+        if window > 0:
+            return self.rolling[window].vwap()
+        return self.session_amount / self.session_volume if self.session_volume > 0 else 0
+
+    def get_rolling_amount(self, window: int = DEFAULT_WINDOW) -> float:
+        return self.rolling[window].amount()
 
     def get_amount(self, time_type: str) -> int:
         if time_type in self.time_type_amount:
@@ -42,6 +106,9 @@ class VolatilityCalculator:
         if stream.time_type not in self.time_type_amount:
             self.time_type_amount[stream.time_type] = 0
         self.time_type_amount[stream.time_type] += int(stream.volume) * int(stream.price)
+        if stream.time_type == TickTimeType.Normal and stream.event_time >= self.today_start:
+            self.session_volume += stream.volume
+            self.session_amount += stream.volume * stream.price
 
     def get_triangle_score(
         self,
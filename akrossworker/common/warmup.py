@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List
+
+
+LOGGER = logging.getLogger(__name__)
+DB_CONCURRENCY = int(os.getenv('AKROSS_WARMUP_DB_CONCURRENCY', '8'))
+RPC_CONCURRENCY = int(os.getenv('AKROSS_WARMUP_RPC_CONCURRENCY', '4'))
+SYMBOL_CONCURRENCY = int(os.getenv('AKROSS_WARMUP_SYMBOL_CONCURRENCY', '32'))
+# failed fetch is retried after 1, 2, 4, ... seconds
+RETRY_COUNT = int(os.getenv('AKROSS_WARMUP_RETRY_COUNT', '3'))
+PROGRESS_INTERVAL = 10  # seconds
+
+
+class _Unlimited:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class WarmupScheduler:
+    """
+    fetch candle caches concurrently, database reads and upstream candle rpc
+    are limited by their own semaphore, 0 means unlimited.
+    caches are started in the given order, so put the most requested first.
+    failed cache is unloaded and retried, run() returns caches failed after retries
+    """
+    def __init__(
+        self,
+        db_concurrency: int = DB_CONCURRENCY,
+        rpc_concurrency: int = RPC_CONCURRENCY,
+        symbol_concurrency: int = SYMBOL_CONCURRENCY,
+        retry_count: int = RETRY_COUNT
+    ):
+        self._db_slot = asyncio.Semaphore(db_concurrency) if db_concurrency > 0 else _Unlimited()
+        self._rpc_slot = asyncio.Semaphore(rpc_concurrency) if rpc_concurrency > 0 else _Unlimited()
+        self.symbol_concurrency = symbol_concurrency
+        self.retry_count = retry_count
+        self.done_count = 0
+        self.total_count = 0
+        self.started = 0
+
+    def db_slot(self):
+        return self._db_slot
+
+    def rpc_slot(self):
+        return self._rpc_slot
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            elapsed = time.monotonic() - self.started
+            LOGGER.warning('warmup progress %d/%d, %.1f symbols/s',
+                           self.done_count, self.total_count,
+                           self.done_count / elapsed if elapsed > 0 else 0)
+
+    async def _run_one(self, cache, symbol_slot) -> bool:
+        async with symbol_slot:
+            for retry in range(self.retry_count + 1):
+                if retry > 0:
+                    await asyncio.sleep(2 ** (retry - 1))
+                try:
+                    await cache.run(self)
+                    self.done_count += 1
+                    return True
+                except Exception as e:
+                    LOGGER.error('warmup failed(%s) %d/%d %s',
+                                 cache.symbol_info.symbol, retry + 1, self.retry_count + 1, str(e))
+                    # partially fetched candles are released before retry
+                    cache.unload()
+        return False
+
+    async def run(self, caches: list) -> list:
+        self.done_count = 0
+        self.total_count = len(caches)
+        self.started = time.monotonic()
+        symbol_slot = asyncio.Semaphore(max(self.symbol_concurrency, 1))
+        reporter = asyncio.create_task(self._report_progress())
+        try:
+            # waiters of semaphore are woken in order, so caches start in the given order
+            results = await asyncio.gather(*[self._run_one(cache, symbol_slot) for cache in caches])
+        finally:
+            reporter.cancel()
+        elapsed = time.monotonic() - self.started
+        failed = [cache for cache, done in zip(caches, results) if not done]
+        LOGGER.warning('warmup done %d symbols in %.1fs', self.done_count, elapsed)
+        if len(failed) > 0:
+            LOGGER.error('warmup failed %d symbols %s',
+                         len(failed), [cache.symbol_info.symbol for cache in failed])
+        return failed
+
+
+class RequestCounter:
+    """
+    candle request count per symbol, kept in database to order warmup of next start
+    """
+    COLLECTION = 'cache_request_count'
+
+    def __init__(self, db, db_name: str):
+        self.db = db
+        self.db_name = db_name
+        self._pending: Dict[str, int] = {}
+
+    def add(self, symbol: str) -> None:
+        self._pending[symbol] = self._pending.get(symbol, 0) + 1
+
+    async def load(self) -> Dict[str, int]:
+        rows = await self.db.get_data(self.db_name, self.COLLECTION)
+        return {row['symbol']: row['count'] for row in rows}
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        for symbol, count in pending.items():
+            await self.db.increase(self.db_name, self.COLLECTION, {'symbol': symbol}, {'count': count})
+
+    @staticmethod
+    def sort_by_count(caches: list, counts: Dict[str, int]) -> List:
+        return sorted(caches, key=lambda cache: counts.get(cache.symbol_info.symbol.lower(), 0), reverse=True)
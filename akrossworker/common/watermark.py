@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pymongo
+
+from akrossworker.common.db import Database
+
+
+LOGGER = logging.getLogger(__name__)
+# one document per candle collection in the same quote database
+CATALOG_COLLECTION = 'candle_catalog'
+# seconds, cached entry is read again after it, other processes may have inserted candles
+CACHE_TTL = int(os.getenv('AKROSS_WATERMARK_CACHE_TTL', '60'))
+
+
+def watermark_update(rows: List[dict]) -> dict:
+    """
+    update of catalog document for inserted candle rows
+    """
+    return {
+        '$min': {
+            'firstStartTime': min(row['startTime'] for row in rows),
+            'firstEndTime': min(row['endTime'] for row in rows)
+        },
+        '$max': {
+            'lastStartTime': max(row['startTime'] for row in rows),
+            'lastEndTime': max(row['endTime'] for row in rows)
+        },
+        '$inc': {'count': len(rows)}
+    }
+
+
+def _watermark(collection_name: str, first: Optional[dict], last: Optional[dict], count: int) -> dict:
+    if first is None or last is None:
+        return {'collection': collection_name, 'count': 0}
+    return {
+        'collection': collection_name,
+        'firstStartTime': first['startTime'],
+        'firstEndTime': first['endTime'],
+        'lastStartTime': last['startTime'],
+        'lastEndTime': last['endTime'],
+        'count': count
+    }
+
+
+def rebuild_sync(database, collection_name: str) -> dict:
+    """
+    rebuild catalog document of a collection with pymongo database, used after deletion
+    """
+    collection = database[collection_name]
+    watermark = _watermark(
+        collection_name,
+        collection.find_one({}, sort=[('startTime', pymongo.ASCENDING)]),
+        collection.find_one({}, sort=[('startTime', pymongo.DESCENDING)]),
+        collection.count_documents({}))
+    database[CATALOG_COLLECTION].replace_one(
+        {'collection': collection_name}, watermark, upsert=True)
+    return watermark
+
+
+def load_sync(database) -> Dict[str, dict]:
+    """
+    whole catalog of pymongo database with one query, key is collection name
+    """
+    catalog = database[CATALOG_COLLECTION]
+    catalog.create_index('collection', unique=True)
+    return {watermark['collection']: watermark
+            for watermark in catalog.find({}, projection={'_id': False})}
+
+
+def get_sync(database, watermarks: Dict[str, dict], collection_name: str) -> dict:
+    if collection_name not in watermarks:
+        LOGGER.info('no watermark of %s, rebuild it', collection_name)
+        watermarks[collection_name] = rebuild_sync(database, collection_name)
+    return watermarks[collection_name]
+
+
+def insert_candles_sync(database, watermarks: Dict[str, dict], collection_name: str, rows: List[dict]) -> None:
+    if len(rows) == 0:
+        return
+    get_sync(database, watermarks, collection_name)
+    database[collection_name].insert_many(rows)
+    watermarks[collection_name] = database[CATALOG_COLLECTION].find_one_and_update(
+        {'collection': collection_name}, watermark_update(rows),
+        upsert=True, projection={'_id': False},
+        return_document=pymongo.ReturnDocument.AFTER)
+
+
+class WatermarkCatalog:
+    """
+    first and last candle times and row count of candle collections in a quote database.
+    whole catalog is read once into memory, entries are updated when candles are
+    inserted through insert_candles, read again after ttl and rebuilt from collection when missing
+    """
+    def __init__(self, db: Database, db_name: str, ttl: int = CACHE_TTL):
+        self.db = db
+        self.db_name = db_name
+        self.ttl = ttl
+        self.watermarks: Dict[str, dict] = {}
+        self._read_at: Dict[str, float] = {}
+        self._load_lock = asyncio.Lock()
+        self.loaded = False
+
+    def _set(self, collection_name: str, watermark: dict) -> None:
+        self.watermarks[collection_name] = watermark
+        self._read_at[collection_name] = time.monotonic()
+
+    async def load(self) -> None:
+        catalog = self.db.client[self.db_name][CATALOG_COLLECTION]
+        await catalog.create_index('collection', unique=True)
+        self.watermarks = {}
+        self._read_at = {}
+        async for watermark in self.db.query(self.db_name, CATALOG_COLLECTION):
+            self._set(watermark['collection'], watermark)
+        self.loaded = True
+
+    async def rebuild(self, collection_name: str) -> dict:
+        database = self.db.client[self.db_name]
+        collection = database[collection_name]
+        watermark = _watermark(
+            collection_name,
+            await collection.find_one({}, sort=[('startTime', pymongo.ASCENDING)]),
+            await collection.find_one({}, sort=[('startTime', pymongo.DESCENDING)]),
+            await collection.count_documents({}))
+        await database[CATALOG_COLLECTION].replace_one(
+            {'collection': collection_name}, watermark, upsert=True)
+        self._set(collection_name, watermark)
+        return watermark
+
+    async def get(self, collection_name: str) -> dict:
+        if not self.loaded:
+            # concurrent first callers read the whole catalog once
+            async with self._load_lock:
+                if not self.loaded:
+                    await self.load()
+        elif (collection_name in self.watermarks and
+                time.monotonic() - self._read_at[collection_name] > self.ttl):
+            watermark = await self.db.client[self.db_name][CATALOG_COLLECTION].find_one(
+                {'collection': collection_name}, projection={'_id': False})
+            if watermark is None:
+                del self.watermarks[collection_name]
+            else:
+                self._set(collection_name, watermark)
+        if collection_name not in self.watermarks:
+            LOGGER.info('no watermark of %s.%s, rebuild it', self.db_name, collection_name)
+            await self.rebuild(collection_name)
+        return self.watermarks[collection_name]
+
+    async def drop(self, collection_name: str) -> None:
+        """
+        drop candle collection with its catalog entry, so it is downloaded again from the start
+        """
+        database = self.db.client[self.db_name]
+        await database[collection_name].drop()
+        await database[CATALOG_COLLECTION].delete_one({'collection': collection_name})
+        self.watermarks.pop(collection_name, None)
+        self._read_at.pop(collection_name, None)
+
+    async def find_first_ms(self, collection_name: str) -> int:
+        return (await self.get(collection_name)).get('firstStartTime', -1)
+
+    async def find_latest_ms(self, collection_name: str) -> int:
+        return (await self.get(collection_name)).get('lastEndTime', -1)
+
+    async def insert_candles(self, collection_name: str, rows: List[dict]) -> None:
+        if len(rows) == 0:
+            return
+        # catalog entry is made before insert, so rebuild in get() does not count rows twice
+        await self.get(collection_name)
+        await self.db.insert_many(self.db_name, collection_name, rows)
+        watermark = await self.db.client[self.db_name][CATALOG_COLLECTION].find_one_and_update(
+            {'collection': collection_name}, watermark_update(rows),
+            upsert=True, projection={'_id': False},
+            return_document=pymongo.ReturnDocument.AFTER)
+        self._set(collection_name, watermark)
+
+
+_shared: Dict[Tuple[int, str], WatermarkCatalog] = {}
+
+
+def shared_catalog(db: Database, db_name: str) -> WatermarkCatalog:
+    """
+    catalog shared by all callers of the same database in a process
+    """
+    key = (id(db), db_name)
+    if key not in _shared:
+        _shared[key] = WatermarkCatalog(db, db_name)
+    return _shared[key]
@@ -1,4 +1,5 @@
 import asyncio
+import heapq
 import logging
 import sys
 from typing import Dict, List
@@ -206,49 +207,51 @@ class CybosBacktestWorker(RpcBase):
         candidates = candidates[:15]
         return [candidate['symbol_info'].to_network() for candidate in candidates]
 
-    async def _prefetch_stream(self, targets: List[str], current: int, interval: int):
-        stream_data = []
+    async def _prefetch_stream(self, targets: List[str], current: int, interval: int) -> List[list]:
+        """
+        time ordered streams of each target in window, merged lazily while playing.
+        window is read in advance while previous one is played, cursors are not kept open
+        during paced or paused playback since idle cursors are closed by server
+        """
+        sources = []
         for symbol in targets:
-            prices = await self._stream_db.get_price_stream_data(symbol, current, current + interval)
-            for price in prices:
-                stream_data.append(PriceStreamProtocol.ParseDatabase(symbol, price))
-            orderbooks = await self._stream_db.get_orderbook_stream_data(symbol, current, current + interval)
-            for orderbook in orderbooks:
+            sources.append([
+                PriceStreamProtocol.ParseDatabase(symbol, price)
+                async for price in self._stream_db.iter_price_stream_data(
+                    symbol, current, current + interval)])
+            orderbooks = []
+            async for orderbook in self._stream_db.iter_orderbook_stream_data(
+                    symbol, current, current + interval):
                 obs = OrderbookStreamProtocol.ParseNetwork(orderbook)
                 obs.set_target(symbol)
-                stream_data.append(obs)
-        LOGGER.warning('total %d fetched', len(stream_data))
-        if len(stream_data) > 0:
-            return sorted(stream_data, key=lambda x: x.event_time)
-        return []
-        
+                orderbooks.append(obs)
+            sources.append(orderbooks)
+        LOGGER.warning('total %d fetched', sum(len(source) for source in sources))
+        return sources
+
     async def start_stream(self, **kwargs):
         targets = self._timeFrame['targets']
         LOGGER.warning('start stream targets: %s', targets)
         interval = aktime.interval_type_to_msec('m') * 10
         self._is_streaming = True
-        stream_data = []
+        sources = []
         while not self._stream_stop and self._timeFrame['current'] <= self._timeFrame['end'] + interval:
             prefetch_task = asyncio.create_task(
                 self._prefetch_stream(targets, self._timeFrame['current'], interval))
             current = self._timeFrame['current']
             self._timeFrame['current'] += interval
-            LOGGER.warning('send stream data ticks(%d)', len(stream_data))
-            if len(stream_data) > 0:
+            LOGGER.warning('send stream data ticks(%d)', sum(len(source) for source in sources))
+            if any(len(source) > 0 for source in sources):
                 current_time = aktime.get_msec()
-                current_frametime = stream_data[0].event_time
-                
-                while len(stream_data) > 0:
-                    if self._stream_pause:
+                current_frametime = 0
+
+                for stream in heapq.merge(*sources, key=lambda x: x.event_time):
+                    while self._stream_pause and not self._stream_stop:
                         LOGGER.warning('pause state')
                         await asyncio.sleep(1)
-                        if self._stream_stop:
-                            LOGGER.warning('stream stop, break loop')
-                            break
-                        else:
-                            continue
-                        
-                    stream = stream_data.pop(0)
+
+                    if current_frametime == 0:
+                        current_frametime = stream.event_time
                     frame_timegap = (stream.event_time - current_frametime) / self._stream_speed
                     realtime_gap = aktime.get_msec() - current_time
                     if self._stream_stop:
@@ -278,8 +281,9 @@ class CybosBacktestWorker(RpcBase):
                             stream.symbol,
                             stream.to_network()
                         )
-            stream_data = await prefetch_task
-            LOGGER.warning('current %s, total tick: %d', datetime_str(current), len(stream_data))
+            sources = await prefetch_task
+            LOGGER.warning('current %s, total tick: %d',
+                           datetime_str(current), sum(len(source) for source in sources))
             await asyncio.sleep(0.1)
         self._is_streaming = False
         self._stream_pause = False
@@ -1,9 +1,13 @@
+from typing import Optional, Tuple
+
 from akross.connection.aio.quote_channel import QuoteChannel, Market
 
 from akrossworker.common.db import Database
 from akross.common import aktime
 from akrossworker.common.protocol import SymbolInfo
 from akrossworker.common.candle_cache import CandleCache
+from akrossworker.common.metrics import RequestMetrics
+from akrossworker.common.ranking import RankingBoard
 from akrossworker.common.unit_candle import UnitCandle
 
 
@@ -14,9 +18,11 @@ class CybosCandleCache(CandleCache):
         db_name: str,
         conn: QuoteChannel,
         market: Market,
-        symbol_info: SymbolInfo
+        symbol_info: SymbolInfo,
+        ranking: Optional[RankingBoard] = None,
+        metrics: Optional[RequestMetrics] = None
     ):
-        super().__init__(db, db_name, conn, market, symbol_info)
+        super().__init__(db, db_name, conn, market, symbol_info, ranking, metrics)
 
     def create_candles(self, db, db_name):
         cybos_intervals = ['m', 'd', 'w', 'M']
@@ -26,12 +32,9 @@ class CybosCandleCache(CandleCache):
                 self.symbol_info, interval_type
             )
 
-    def get_data(self, interval: str):
+    def dissect_interval(self, interval: str) -> Tuple[str, int]:
         interval, interval_type = aktime.interval_dissect(interval)
         if interval_type == 'h':
             interval_type = 'm'
             interval = interval * 60
-
-        if interval_type in self.candles:
-            return self.candles[interval_type].get_candle(interval)
-        return []
+        return interval_type, interval
@@ -11,6 +11,7 @@ from akrossworker.common.args_constants import TradingStatus
 from akrossworker.common.protocol import SymbolInfo
 from akross.common import env
 from akrossworker.common.db import DBEnum
+from akrossworker.common import watermark
 from akrossworker.cybos.api.connection import CybosConnection
 
 
@@ -78,6 +79,8 @@ def main() -> None:
     ]
     symbol_infos = create_symbol_info()
     client = MongoClient(MONGO_URI)
+    db = client[DBEnum.KRX_QUOTE_DB]
+    watermarks = watermark.load_sync(db)
     now = aktime.get_msec()
     for progress, symbol_info in enumerate(symbol_infos):
         if len(sys.argv) > 1:
@@ -99,14 +102,13 @@ def main() -> None:
         for interval in intervals:
             interval_start_time = start_time
             col = symbol_info.symbol.lower() + '_' + interval
-            db = client[DBEnum.KRX_QUOTE_DB]
-            db_col = db[col]
-            for latest_data in db_col.find().limit(1).sort([('$natural', -1)]):
-                interval_start_time = latest_data['endTime'] + 1
+            latest_time = watermark.get_sync(db, watermarks, col).get('lastEndTime', -1)
+            if latest_time > 0:
+                interval_start_time = latest_time + 1
                 LOGGER.warning('last data for[%s](%s): %s',
                                interval,
                                symbol_info.symbol,
-                               datetime.fromtimestamp(latest_data['endTime'] / 1000))
+                               datetime.fromtimestamp(latest_time / 1000))
 
             query = {
                 'startTime': interval_start_time,
@@ -122,14 +124,14 @@ def main() -> None:
             for data in candles:
                 if data.end_time > now or data.start_time < interval_start_time:
                     continue
-                record_data.append(data.to_database())
+                record_data.append(data.to_database(integer_price=True))
 
             if len(record_data) > 0:
                 LOGGER.warning('write to db(%s): len %d, from: %s, until: %s',
                                interval, len(record_data),
                                datetime.fromtimestamp(record_data[0]['startTime'] / 1000),
                                datetime.fromtimestamp(record_data[-1]['endTime'] / 1000))
-                db_col.insert_many(record_data)
+                watermark.insert_candles_sync(db, watermarks, col, record_data)
                 LOGGER.warning('write to db done')
         LOGGER.warning('done %s', symbol_info.symbol.upper())
 
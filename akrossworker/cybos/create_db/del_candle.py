@@ -10,6 +10,7 @@ from akrossworker.common.args_constants import TradingStatus
 from akrossworker.common.protocol import SymbolInfo
 from akross.common import env
 from akrossworker.common.db import DBEnum
+from akrossworker.common import watermark
 from akrossworker.cybos.api.connection import CybosConnection
 
 
@@ -94,6 +95,8 @@ def main() -> None:
             # result = db_col.delete_many(query2)
 
             LOGGER.warning('deleted(%s): %d', interval, result.deleted_count)
+            if result.deleted_count > 0:
+                watermark.rebuild_sync(db, col)
         LOGGER.warning('done %s', symbol_info.symbol.upper())
     app.quit()
 
@@ -36,11 +36,9 @@ class KrxStat:
         self.data = {}
 
     async def preload(self):
-        data = await self.info.stat_db.get_data(self.stat_name,
-                                                self.get_symbol_name())
-        if data and len(data) > 0:
-            for row in data:
-                self.data[row['yyyymmdd']] = row
+        async for row in self.info.stat_db.iter_data(self.stat_name,
+                                                     self.get_symbol_name()):
+            self.data[row['yyyymmdd']] = row
 
     async def _upsert(self, server_row):
         date = server_row['yyyymmdd']
@@ -64,11 +64,12 @@ class DailyStatDatabase:
         client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
         self.db = client[DBEnum.KRX_TASK_DB]
 
-    async def get_data(self, collection, symbol_name):
+    async def iter_data(self, collection, symbol_name):
         cursor = self.db[collection].find({
             'symbol': symbol_name
         }, projection={'_id': False, 'symbol': False})
-        return await cursor.to_list(None)
+        async for row in cursor:
+            yield row
 
     async def upsert_data(self, collection, data):
         LOGGER.debug('upsert_data %s, %s', collection, data)
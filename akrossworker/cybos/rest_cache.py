@@ -1,11 +1,13 @@
 import asyncio
 import logging
 import sys
+import time
 from typing import Dict, List
 
 from akross.connection.aio.quote_channel import QuoteChannel, Market
 from akross.common import enums, util
 from akrossworker.common.candle_cache import CandleCache
+from akrossworker.common.metrics import TOTAL, RequestMetrics, summarize
 from akrossworker.common.command import ApiCommand
 from akrossworker.common.db import DBEnum, Database
 from akrossworker.common.protocol import SymbolInfo
@@ -13,19 +15,30 @@ from akross.common import aktime
 from akross.rpc.base import RpcBase
 from akrossworker.common.args_constants import ApiArgKey as Args
 from akrossworker.common.args_constants import TickTimeType
+from akrossworker.common.args_constants import CandleFormat
 from akrossworker.cybos.candle_cache import CybosCandleCache
+from akrossworker.common.ranking import RankingBoard, TRIANGLE_SCORE, amount_ratio_key
+from akrossworker.common.shard import (
+    SHARD_COUNT, WITH_SCORE, create_router, shard_of
+)
+from akrossworker.common.symbol_info_cache import SymbolInfoCache
+from akrossworker.common.symbol_search import SymbolSearchIndex
+from akrossworker.common.warmup import RequestCounter, WarmupScheduler
 from akross.common import env
 from datetime import datetime
 
 
 LOGGER = logging.getLogger(__name__)
 MARKET_NAME = 'krx.spot'
+TICK_STAT_INTERVAL = 600
+SNAPSHOT_INTERVAL = 1800
+RANK_COUNT = 15
 FAVORITE_COLLECTION = 'favorite'
 GROUP_COLLECTION = 'group'
 
 
 class CybosRestCache(RpcBase):
-    def __init__(self):
+    def __init__(self, shard_index: int = 0, shard_count: int = 1):
         super().__init__()
         self.candle = self.on_candle
         self.symbolInfo = self.on_symbol_info
@@ -37,15 +50,26 @@ class CybosRestCache(RpcBase):
         self.setFavorite = self.on_set_favorite
         self.group = self.on_group
         self.set_group = self.on_set_group
+        self.cacheStat = self.on_cache_stat
 
         self._worker: Market = None
         self._symbols: Dict[str, CandleCache] = {}
         self._symbol_info_cache: Dict[str, SymbolInfo] = {}
+        self._search_index = SymbolSearchIndex([])
+        self._symbol_info_payload = SymbolInfoCache()
+        self._metrics = RequestMetrics()
+        self._ranking = RankingBoard()
+        # candles of symbols in other shards are not loaded, symbol master is kept for search
+        self._shard_index = shard_index
+        self._shard_count = shard_count
         self._conn = QuoteChannel(MARKET_NAME)
         self._db = Database()
+        self._request_counter = RequestCounter(self._db, DBEnum.KRX_QUOTE_DB)
 
     async def preload(self):
         asyncio.create_task(self._check_exit())
+        asyncio.create_task(self._report_tick_stat())
+        asyncio.create_task(self._save_snapshots())
         await self._conn.connect()
         await self._conn.market_discovery()
         await self._conn.wait_for_market(MARKET_NAME)
@@ -62,10 +86,36 @@ class CybosRestCache(RpcBase):
             now = datetime.now()
             if prev.hour == 4 and now.hour == 5:
                 LOGGER.error('turn off cache')
+                await self._request_counter.flush()
+                await self.save_snapshots()
                 sys.exit(0)
             prev = datetime.now()
             await asyncio.sleep(60)
 
+    async def _report_tick_stat(self):
+        while True:
+            await asyncio.sleep(TICK_STAT_INTERVAL)
+            stats = sorted([cache.get_tick_stat() for cache in self._symbols.values()],
+                           key=lambda stat: stat['elapsedMs'], reverse=True)
+            LOGGER.warning('tick cpu top symbols %s', stats[:10])
+            LOGGER.warning('cache metrics %s', self.get_cache_stat())
+            await self._request_counter.flush()
+
+    async def save_snapshots(self) -> None:
+        started = time.monotonic()
+        for cache in list(self._symbols.values()):
+            try:
+                await cache.save_snapshot()
+            except OSError as e:
+                LOGGER.error('cannot save snapshot(%s) %s', cache.symbol_info.symbol, str(e))
+        LOGGER.warning('snapshot saved %d symbols in %.1fs',
+                       len(self._symbols), time.monotonic() - started)
+
+    async def _save_snapshots(self):
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+            await self.save_snapshots()
+
     async def regist_symbols(self) -> None:
         _, symbols = await self._conn.api_call(
             self._worker, ApiCommand.SymbolInfo, cache=False)
@@ -73,17 +123,27 @@ class CybosRestCache(RpcBase):
             LOGGER.error('no symbols')
             sys.exit(1)
         
-        for i, symbol in enumerate(symbols):
+        caches = []
+        for symbol in symbols:
             symbol_info = SymbolInfo.CreateSymbolInfo(symbol)
-            LOGGER.info('progress(%s) %d/%d', symbol_info.symbol, i+1, len(symbols))
             if symbol_info.symbol not in self._symbols:
                 symbol_name = symbol_info.symbol.lower()
                 self._symbol_info_cache[symbol_name] = symbol_info
+                if shard_of(symbol_name, self._shard_count) != self._shard_index:
+                    continue
                 self._symbols[symbol_name] = \
                     CybosCandleCache(
                         self._db, DBEnum.KRX_QUOTE_DB,
-                        self._conn, self._worker, symbol_info)
-                await self._symbols[symbol_info.symbol.lower()].run()
+                        self._conn, self._worker, symbol_info, self._ranking, self._metrics)
+                caches.append(self._symbols[symbol_name])
+        self._search_index = SymbolSearchIndex(self._symbol_info_cache.values())
+        self._symbol_info_payload.update(self._symbol_info_cache.values())
+
+        counts = await self._request_counter.load()
+        failed = await WarmupScheduler().run(self._request_counter.sort_by_count(caches, counts))
+        for cache in failed:
+            # candle request of failed symbol returns nothing instead of partial candles
+            del self._symbols[cache.symbol_info.symbol.lower()]
 
     async def on_orderbook(self, **kwargs):
         util.check_required_parameters(kwargs, 'symbol')
@@ -96,9 +156,36 @@ class CybosRestCache(RpcBase):
         interval = kwargs['interval']
         symbol = kwargs['symbol'].lower()
         if symbol in self._symbols:
-            return self._symbols[symbol].get_data(interval)
+            self._request_counter.add(symbol)
+            cache = self._symbols[symbol]
+            with self._metrics.measure(TOTAL):
+                if Args.PAGE_SIZE in kwargs:
+                    return cache.get_page(
+                        interval,
+                        kwargs.get(Args.START_TIME, 0),
+                        kwargs.get(Args.END_TIME, 0),
+                        int(kwargs[Args.PAGE_SIZE]),
+                        kwargs.get(Args.CANDLE_FORMAT, CandleFormat.Legacy),
+                        kwargs.get(Args.CURSOR, '')
+                    )
+                return cache.get_response(
+                    interval,
+                    kwargs.get(Args.START_TIME, 0),
+                    kwargs.get(Args.END_TIME, 0),
+                    kwargs.get(Args.CANDLE_COUNT, 0),
+                    kwargs.get(Args.CANDLE_FORMAT, CandleFormat.Legacy)
+                )
         return []
 
+    def get_cache_stat(self) -> dict:
+        return summarize([cache.get_metrics() for cache in self._symbols.values()], self._metrics)
+
+    async def on_cache_stat(self, **kwargs):
+        if 'symbol' in kwargs:
+            symbol = kwargs['symbol'].lower()
+            return self._symbols[symbol].get_metrics() if symbol in self._symbols else {}
+        return self.get_cache_stat()
+
     def get_market_type(self) -> str:
         now = aktime.get_msec()
         hmsec = aktime.interval_type_to_msec('h')
@@ -110,47 +197,22 @@ class CybosRestCache(RpcBase):
             return TickTimeType.MarketCloseBid
         return TickTimeType.Normal
 
-    async def on_krx_moment_rank(self, **kwargs):
-        candidates = []
-        for symbol, cache in self._symbols.items():
-            candles = cache.get_interval_type_data('m')
-            market_type = self.get_market_type()
-            if (len(candles) > 0 and symbol in self._symbol_info_cache):
-                try:
-                    amount = cache.get_amount(market_type)
-                    market_cap = int(self._symbol_info_cache[symbol].market_cap)
-                except Exception:
-                    continue
-
-                if market_cap <= 0:
-                    continue
+    def _ranked(self, key: str, with_score: bool) -> list:
+        # router of shards merges [symbol info, score] of each shard
+        result = []
+        for symbol, score in self._ranking.top_scores(key, RANK_COUNT):
+            data = self._symbol_info_cache[symbol].to_network()
+            result.append([data, score] if with_score else data)
+        return result
 
-                ratio = amount / market_cap
-                candidates.append({'symbol_info': self._symbol_info_cache[symbol],
-                                   'ratio': ratio})
-        candidates.sort(key=lambda candidate: candidate['ratio'], reverse=True)
-        candidates = candidates[:15]
-        return [candidate['symbol_info'].to_network() for candidate in candidates]
+    async def on_krx_moment_rank(self, **kwargs):
+        return self._ranked(amount_ratio_key(self.get_market_type()), kwargs.get(WITH_SCORE, False))
 
     async def on_krx_pick(self, **kwargs):
-        candidates = []
-        for symbol, cache in self._symbols.items():
-            if symbol in self._symbol_info_cache:
-                score = cache.get_triangle_score()
-                if score > 0:
-                    candidates.append({
-                        'symbol_info': self._symbol_info_cache[symbol],
-                        'score': score
-                    })
-        candidates.sort(key=lambda candidate: candidate['score'], reverse=True)
-        candidates = candidates[:15]
-        return [candidate['symbol_info'].to_network() for candidate in candidates]
+        return self._ranked(TRIANGLE_SCORE, kwargs.get(WITH_SCORE, False))
 
     async def on_symbol_info(self, **kwargs):
-        result = []
-        for symbol in self._symbols.values():
-            result.append(symbol.get_symbol_info().to_network())
-        return result
+        return self._symbol_info_payload.get(kwargs.get(Args.STATUS), kwargs.get(Args.SECTORS))
 
     async def on_favorite(self, **kwargs):
         util.check_required_parameters(kwargs, 'user')
@@ -185,19 +247,31 @@ class CybosRestCache(RpcBase):
             kwargs[Args.KEYWORD] if Args.KEYWORD in kwargs else 'no keyword',
             kwargs[Args.SECTORS] if Args.SECTORS in kwargs else 'no sectors'
         )
-        result = []
-        for symbol in self._symbols.values():
-            if symbol.symbol_matched(**kwargs):
-                result.append(symbol.get_symbol_info().to_network())
-        return result
+        symbol_infos = self._search_index.search(
+            kwargs.get(Args.KEYWORD),
+            kwargs.get(Args.SECTORS),
+            int(kwargs.get(Args.LIMIT, 0))
+        )
+        return [symbol_info.to_network() for symbol_info in symbol_infos]
+
+
+def create_shard(shard_index: int, shard_count: int) -> CybosRestCache:
+    return CybosRestCache(shard_index, shard_count)
 
 
 async def main() -> None:
     LOGGER.warning('run rest provider')
     conn = QuoteChannel(MARKET_NAME, env.get_rmq_url())
 
-    rest_provider = CybosRestCache()
-    await rest_provider.preload()
+    if SHARD_COUNT > 1:
+        rest_provider = await create_router(
+            create_shard, SHARD_COUNT,
+            ['candle', 'orderbook', 'cacheStat'],
+            {'krxMomentRank': RANK_COUNT, 'krxPick': RANK_COUNT},
+            ['symbolInfo', 'search', 'favorite', 'setFavorite', 'group', 'set_group'])
+    else:
+        rest_provider = CybosRestCache()
+        await rest_provider.preload()
     await conn.connect()
     await conn.run_with_bus_queue(enums.WorkerType.Cache, rest_provider)
     await asyncio.get_running_loop().create_future()
@@ -2,6 +2,7 @@ import asyncio
 from akrossworker.common.db import Database, DBEnum
 from akrossworker.common.command import ApiCommand
 from akrossworker.common.protocol import SymbolInfo
+from akrossworker.common.watermark import WatermarkCatalog
 from akross.connection.aio.quote_channel import QuoteChannel
 import sys
 
@@ -15,7 +16,7 @@ async def main():
     await conn.market_discovery()
     await conn.wait_for_market(MARKET_NAME)
     krx = conn.get_markets(MARKET_NAME)[0]
-    db = Database()
+    catalog = WatermarkCatalog(Database(), DBEnum.KRX_QUOTE_DB)
     intervals = ['1m', '1d', '1w', '1M']
     ret, symbols = await conn.api_call(krx, ApiCommand.SymbolInfo, cache=False)
     if not isinstance(symbols, list) or len(symbols) == 0:
@@ -26,7 +27,7 @@ async def main():
         symbol_info = SymbolInfo.CreateSymbolInfo(symbol)
         if 'index' in symbol_info.sectors or 'etf' in symbol_info.sectors:
             for interval in intervals:
-                await db.drop_collection(DBEnum.KRX_QUOTE_DB, symbol_info.symbol.lower() + '_' + interval)
+                await catalog.drop(symbol_info.symbol.lower() + '_' + interval)
 
 
 if __name__ == '__main__':
@@ -1,12 +1,11 @@
 from datetime import datetime
 import asyncio
 from typing import List
-from akrossworker.common.db import DBEnum
+from akrossworker.common.db import Database
 from akross.common import aktime
 from akrossworker.common.args_constants import (
     CandleLimitDays
 )
-from akrossworker.common.db_quote_query import DBQuoteQuery
 from akrossworker.common.protocol import PriceStreamProtocol
 
 
@@ -15,21 +14,20 @@ def get_db_start_search(interval_type) -> int:
         CandleLimitDays.get_limit_days(interval_type))
 
 
-async def get_rprice_on_day(db: DBQuoteQuery, symbol: str, ms: int) -> List[PriceStreamProtocol]:
+async def get_rprice_on_day(db: Database, symbol: str, ms: int) -> List[PriceStreamProtocol]:
     search_ms = aktime.get_start_time(ms, 'd', 'KRX')
-    data = await db.get_price_stream_data(
+    results: List[PriceStreamProtocol] = []
+    async for row in db.iter_price_stream_data(
         symbol.lower(),
         search_ms,
         search_ms + aktime.interval_type_to_msec('d') - 1
-    )
-    results: List[PriceStreamProtocol] = []
-    for row in data:
+    ):
         results.append(PriceStreamProtocol.ParseDatabase(symbol, row))
     return results
 
 
 async def read():
-    db = DBQuoteQuery(DBEnum.KRX_QUOTE_DB)
+    db = Database()
     """
     check when extended time and normal time mixed
     """